@@ -1,5 +1,6 @@
 from typing import Type
 
+from fastapi import Request, Response
 from nxtools import logging
 
 from ayon_server.addons import BaseServerAddon
@@ -9,14 +10,26 @@ from ayon_server.exceptions import ForbiddenException, InvalidSettingsException
 from ayon_server.secrets import Secrets
 
 from .kitsu import Kitsu, KitsuMock
+from .kitsu.anatomy import SettingsIndexes, TaskStatusCache
+from .kitsu.indexes import ensure_kitsu_id_indexes
 from .kitsu.init_pairing import InitPairingRequest, init_pairing, sync_request
-from .kitsu.pairing_list import PairingItemModel, get_pairing_list
+from .kitsu.pairing_list import (
+    PairingItemModel,
+    PairingListCache,
+    etag_matches,
+    get_pairing_list,
+)
 from .kitsu.push import (
     PushEntitiesRequestModel,
     RemoveEntitiesRequestModel,
+    SyncedCountModel,
+    SyncedIdsModel,
+    get_synced_count,
+    get_synced_ids,
     push_entities,
     remove_entities,
 )
+from .kitsu.sync_session import SyncSessions
 from .settings import DEFAULT_VALUES, KitsuSettings
 
 #
@@ -35,6 +48,15 @@ class KitsuAddon(BaseServerAddon):
     }
 
     kitsu: Kitsu | None = None
+    sync_sessions: SyncSessions
+    pairing_cache: PairingListCache
+    task_status_cache: TaskStatusCache
+
+    # studio settings are cached between requests and dropped whenever
+    #   they change, which bumps the version
+    settings_version: int = 0
+    settings_snapshot: tuple[int, KitsuSettings] | None = None
+    settings_indexes: tuple[KitsuSettings, SettingsIndexes] | None = None
 
     async def get_default_settings(self):
         settings_model_cls = self.get_settings_model()
@@ -45,14 +67,37 @@ class KitsuAddon(BaseServerAddon):
     #
 
     def initialize(self):
+        self.sync_sessions = SyncSessions()
+        self.pairing_cache = PairingListCache()
+        self.task_status_cache = TaskStatusCache()
+
         self.add_endpoint("/pairing", self.list_pairings, method="GET")
         self.add_endpoint("/pairing", self.init_pairing, method="POST")
         self.add_endpoint("/sync/{project_name}", self.sync, method="POST")
         self.add_endpoint("/push", self.push, method="POST")
         self.add_endpoint("/remove", self.remove, method="POST")
+        self.add_endpoint(
+            "/synced-ids/{project_name}", self.synced_ids, method="GET"
+        )
+        self.add_endpoint(
+            "/synced-count/{project_name}", self.synced_count, method="GET"
+        )
 
     async def setup(self):
-        pass
+        try:
+            await ensure_kitsu_id_indexes()
+        except Exception as e:
+            logging.error(f"Unable to create kitsuId indexes: {e}")
+
+    async def on_settings_changed(self, *args, **kwargs):
+        self.settings_version += 1
+        self.settings_snapshot = None
+        self.settings_indexes = None
+        self.pairing_cache.invalidate()
+        self.task_status_cache.invalidate()
+        # server url or credentials might have changed,
+        # the client is created again on the next request
+        await self.close_kitsu()
 
     #
     # Endpoints
@@ -72,11 +117,17 @@ class KitsuAddon(BaseServerAddon):
     ):
         if not user.is_manager:
             raise ForbiddenException("Only managers can sync Kitsu projects")
-        return await push_entities(
-            self,
-            user=user,
-            payload=payload,
-        )
+        try:
+            return await push_entities(
+                self,
+                user=user,
+                payload=payload,
+            )
+        except Exception:
+            # the session may reference folders of a rolled back batch
+            if payload.session_id:
+                self.sync_sessions.close(payload.session_id)
+            raise
 
     async def remove(
         self,
@@ -92,11 +143,48 @@ class KitsuAddon(BaseServerAddon):
             payload=payload,
         )
 
+    async def synced_ids(
+        self,
+        user: CurrentUser,
+        project_name: str,
+    ) -> SyncedIdsModel:
+        if not user.is_manager:
+            raise ForbiddenException("Only managers can sync Kitsu projects")
+        return await get_synced_ids(project_name)
+
+    async def synced_count(
+        self,
+        user: CurrentUser,
+        project_name: str,
+    ) -> SyncedCountModel:
+        if not user.is_manager:
+            raise ForbiddenException("Only managers can sync Kitsu projects")
+        return await get_synced_count(project_name)
+
     async def list_pairings(
-        self, mock: bool = False
+        self,
+        request: Request,
+        response: Response,
+        mock: bool = False,
     ) -> list[PairingItemModel]:
         await self.ensure_kitsu(mock)
-        return await get_pairing_list(self)
+        if mock:
+            return await get_pairing_list(self)
+
+        cached = self.pairing_cache.get()
+        if cached is None:
+            items = await get_pairing_list(self)
+            etag = self.pairing_cache.set(items)
+        else:
+            items, etag = cached
+
+        # clients revalidate the list on every request and skip the
+        #   payload when it did not change
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(etag, request.headers.get("If-None-Match")):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return items
 
     async def init_pairing(
         self,
@@ -106,12 +194,52 @@ class KitsuAddon(BaseServerAddon):
         if not user.is_manager:
             raise ForbiddenException("Only managers can pair Kitsu projects")
         await self.ensure_kitsu()
-        await init_pairing(self, user, request)
+        try:
+            await init_pairing(self, user, request)
+        finally:
+            self.pairing_cache.invalidate()
         return EmptyResponse(status_code=201)
 
     #
     # Helpers
     #
+    async def get_settings_snapshot(self) -> KitsuSettings:
+        """Return the studio settings, resolved once per settings version
+
+        A request or sync session takes one snapshot and passes it down
+        instead of resolving the settings again for every entity.
+        """
+        version = self.settings_version
+        if self.settings_snapshot is not None:
+            snapshot_version, settings = self.settings_snapshot
+            if snapshot_version == version:
+                return settings
+        settings = await self.get_studio_settings()
+        # settings changed while they were resolved are not cached
+        if version == self.settings_version:
+            self.settings_snapshot = (version, settings)
+        return settings
+
+    def get_settings_indexes(self, settings: KitsuSettings) -> SettingsIndexes:
+        """Return the lookup tables of a settings snapshot
+
+        They are built once for the latest snapshot, older snapshots
+        still held by a sync session get tables of their own.
+        """
+        if self.settings_indexes is not None:
+            indexed_settings, indexes = self.settings_indexes
+            if indexed_settings is settings:
+                return indexes
+        indexes = SettingsIndexes(settings)
+        self.settings_indexes = (settings, indexes)
+        return indexes
+
+    async def close_kitsu(self):
+        if self.kitsu is None:
+            return
+        kitsu, self.kitsu = self.kitsu, None
+        await kitsu.close()
+
     async def ensure_kitsu(self, mock: bool = False):
         if self.kitsu is not None:
             return
@@ -120,7 +248,7 @@ class KitsuAddon(BaseServerAddon):
             self.kitsu = KitsuMock()
             return
 
-        settings = await self.get_studio_settings()
+        settings = await self.get_settings_snapshot()
         if not settings.server:
             raise InvalidSettingsException("Kitsu server is not set")
 
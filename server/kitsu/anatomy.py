@@ -1,4 +1,6 @@
+import asyncio
 import contextlib
+import time
 from typing import TYPE_CHECKING, Any
 
 from ayon_server.entities import ProjectEntity
@@ -14,10 +16,58 @@ from .extract_ayon_project_anatomy import extract_ayon_project_anatomy
 
 if TYPE_CHECKING:
     from .. import KitsuAddon
+    from ..settings import KitsuSettings
+    from ..settings.sync_settings import StatusCondition, TaskCondition
+
+# seconds the global Kitsu task statuses are reused between projects
+TASK_STATUS_TTL = 60
+
+
+class TaskStatusCache:
+    """The global Kitsu task statuses, shared by all projects"""
+
+    def __init__(self, ttl: float = TASK_STATUS_TTL):
+        self.ttl = ttl
+        self.statuses: list[dict[str, Any]] | None = None
+        self.fetched_at = 0.0
+
+    async def get(self, addon: "KitsuAddon") -> list[dict[str, Any]]:
+        if self.statuses is None or time.time() - self.fetched_at > self.ttl:
+            response = await addon.kitsu.get("data/task-status")
+            if response.status_code != 200:
+                raise AyonException("Could not get Kitsu statuses")
+            self.statuses = response.json()
+            self.fetched_at = time.time()
+        # the statuses are modified by their callers
+        return [dict(status) for status in self.statuses]
+
+    def invalidate(self) -> None:
+        self.statuses = None
+
+
+class SettingsIndexes:
+    """The task type and status settings by their case-folded names
+
+    Built once per settings snapshot, see `KitsuAddon.get_settings_indexes`
+    """
+
+    def __init__(self, settings: "KitsuSettings"):
+        sync_info = settings.sync_settings.default_sync_info
+        # the last entry of a name wins
+        self.task_types: dict[str, "TaskCondition"] = {
+            task.name.casefold(): task
+            for task in sync_info.default_task_info
+        }
+        self.statuses: dict[str, "StatusCondition"] = {
+            status.short_name.casefold(): status
+            for status in sync_info.default_status_info
+        }
 
 
 async def parse_task_types(
-    addon: "KitsuAddon", kitsu_project_id: str
+    addon: "KitsuAddon",
+    kitsu_project_id: str,
+    settings: "KitsuSettings",
 ) -> list[TaskType]:
     """
 
@@ -52,25 +102,21 @@ async def parse_task_types(
     )
     if task_status_response.status_code != 200:
         raise AyonException("Could not get Kitsu task types")
+    indexes = addon.get_settings_indexes(settings)
     result: list[TaskType] = []
+    names: set[str] = set()
     for kitsu_task_type in task_status_response.json():
         # Check if the task already exist
         # eg. Concept under Assets and the hardcoded Concept under Concepts
-        if any(d.name == kitsu_task_type["name"] for d in result):
+        if kitsu_task_type["name"] in names:
             continue
+        names.add(kitsu_task_type["name"])
 
-        short_name = None
-        icon = None
-
-        settings = await addon.get_studio_settings()
-        found = False
-        for task in settings.sync_settings.default_sync_info.default_task_info:
-            if task.name.lower() == kitsu_task_type["name"].lower():
-                found = True
-                short_name = task.short_name
-                icon = task.icon
-
-        if not found:
+        task = indexes.task_types.get(kitsu_task_type["name"].casefold())
+        if task is not None:
+            short_name = task.short_name
+            icon = task.icon
+        else:
             short_name = kitsu_task_type.get("short_name")
             if not short_name:
                 name_slug = remove_accents(kitsu_task_type["name"].lower())
@@ -89,7 +135,9 @@ async def parse_task_types(
 
 
 async def parse_statuses(
-    addon: "KitsuAddon", kitsu_project_id: str
+    addon: "KitsuAddon",
+    kitsu_project_id: str,
+    settings: "KitsuSettings",
 ) -> list[Status]:
     """Map kitsu status to ayon status
 
@@ -123,25 +171,17 @@ async def parse_statuses(
 
     """
 
-    task_status_response = await addon.kitsu.get("data/task-status")
-    if task_status_response.status_code != 200:
-        raise AyonException("Could not get Kitsu statuses")
-
     result: list[Status] = []
-    kitsu_statuses = task_status_response.json()
+    kitsu_statuses = await addon.task_status_cache.get(addon)
     kitsu_statuses.sort(key=lambda x: not x.get("is_default"))
-    settings = await addon.get_studio_settings()
 
+    indexes = addon.get_settings_indexes(settings)
     for status in kitsu_statuses:
-        found = False
-        for (
-            settings_status
-        ) in settings.sync_settings.default_sync_info.default_status_info:
-            if status["short_name"] == settings_status.short_name:
-                found = True
-                status["icon"] = settings_status.icon
-                status["state"] = settings_status.state
-        if not found:
+        settings_status = indexes.statuses.get(status["short_name"].casefold())
+        if settings_status is not None:
+            status["icon"] = settings_status.icon
+            status["state"] = settings_status.state
+        else:
             status["icon"] = "task_alt"
             status["state"] = "in_progress"
 
@@ -203,9 +243,24 @@ async def get_kitsu_project_anatomy(
     addon: "KitsuAddon",
     kitsu_project_id: str,
     ayon_project: ProjectEntity | None = None,
+    settings: "KitsuSettings | None" = None,
 ) -> Anatomy:
-    kitsu_project_response = await addon.kitsu.get(
-        f"data/projects/{kitsu_project_id}"
+    if settings is None:
+        settings = await addon.get_settings_snapshot()
+
+    async def get_base_anatomy() -> Anatomy:
+        if ayon_project:
+            return extract_ayon_project_anatomy(ayon_project)
+        return await get_primary_anatomy_preset()
+
+    # the requests are independent of each other
+    kitsu_project_response, statuses, task_types, anatomy = (
+        await asyncio.gather(
+            addon.kitsu.get(f"data/projects/{kitsu_project_id}"),
+            parse_statuses(addon, kitsu_project_id, settings),
+            parse_task_types(addon, kitsu_project_id, settings),
+            get_base_anatomy(),
+        )
     )
     if kitsu_project_response.status_code != 200:
         raise AyonException("Could not get Kitsu project")
@@ -213,13 +268,6 @@ async def get_kitsu_project_anatomy(
     kitsu_project = kitsu_project_response.json()
 
     attributes = parse_attrib(kitsu_project)
-    statuses = await parse_statuses(addon, kitsu_project_id)
-    task_types = await parse_task_types(addon, kitsu_project_id)
-
-    if ayon_project:
-        anatomy = extract_ayon_project_anatomy(ayon_project)
-    else:
-        anatomy = await get_primary_anatomy_preset()
 
     if ayon_project:
         prj_name = ayon_project.name
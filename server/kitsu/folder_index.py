@@ -0,0 +1,59 @@
+from typing import Iterable, NamedTuple
+
+from ayon_server.entities import ProjectEntity
+from ayon_server.lib.postgres import Postgres
+
+
+class IndexedFolder(NamedTuple):
+    """What the push needs to know about a synced folder"""
+
+    id: str
+    frame_start: int | None
+    folder_type: str | None
+
+
+async def load_folder_index(
+    project: ProjectEntity,
+    kitsu_ids: Iterable[str] | None = None,
+) -> dict[str, IndexedFolder]:
+    """Index all folders of the project synced from Kitsu by their Kitsu ID
+
+    When `kitsu_ids` are given, only these folders are indexed.
+
+    The frame start is the effective one, inherited from the parent
+    folder or the project when the folder does not set its own.
+    """
+    project_frame_start = getattr(project.attrib, "frameStart", None)
+    conditions = ["f.data ? 'kitsuId'"]
+    args = []
+    if kitsu_ids is not None:
+        conditions.append("f.data->>'kitsuId' = ANY($1)")
+        args.append(list(kitsu_ids))
+    index: dict[str, IndexedFolder] = {}
+    async for row in Postgres.iterate(
+        f"""
+        SELECT
+            f.id,
+            f.data->>'kitsuId' AS kitsu_id,
+            f.folder_type,
+            COALESCE(
+                f.attrib->>'frameStart',
+                ex.attrib->>'frameStart'
+            ) AS frame_start
+        FROM project_{project.name}.folders AS f
+        LEFT JOIN project_{project.name}.exported_attributes AS ex
+            ON f.parent_id = ex.folder_id
+        WHERE {" AND ".join(conditions)}
+        """,
+        *args,
+    ):
+        frame_start = row["frame_start"]
+        index[row["kitsu_id"]] = IndexedFolder(
+            id=row["id"],
+            frame_start=(
+                project_frame_start if frame_start is None
+                else int(frame_start)
+            ),
+            folder_type=row["folder_type"],
+        )
+    return index
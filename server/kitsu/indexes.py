@@ -0,0 +1,57 @@
+"""Expression indexes on `data->>'kitsuId'`
+
+Synced folders, tasks and users are looked up by their Kitsu ID stored
+in `data`. Without an index every lookup is a sequential scan of the table.
+"""
+
+from nxtools import logging
+
+from ayon_server.lib.postgres import Postgres
+
+# project level tables holding entities synced from Kitsu
+PROJECT_TABLES = ("folders", "tasks")
+
+
+async def ensure_user_kitsu_id_index() -> None:
+    await Postgres.execute(
+        """
+        CREATE INDEX IF NOT EXISTS users_kitsu_id_idx
+        ON public.users ((data->>'kitsuId'))
+        """
+    )
+
+
+async def ensure_project_kitsu_id_indexes(project_name: str) -> None:
+    for table in PROJECT_TABLES:
+        await Postgres.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS {table}_kitsu_id_idx
+            ON project_{project_name}.{table} ((data->>'kitsuId'))
+            """
+        )
+
+
+async def ensure_kitsu_id_indexes() -> None:
+    """Create the kitsuId indexes for users and all paired projects
+
+    Runs on addon setup, so projects paired before the indexes were
+    introduced get them as well.
+    """
+    await ensure_user_kitsu_id_index()
+
+    project_names = [
+        row["name"]
+        async for row in Postgres.iterate(
+            """
+            SELECT name FROM projects
+            WHERE data->>'kitsuProjectId' IS NOT NULL
+            """
+        )
+    ]
+    for project_name in project_names:
+        try:
+            await ensure_project_kitsu_id_indexes(project_name)
+        except Exception as e:
+            logging.warning(
+                f"Unable to create kitsuId indexes for {project_name}: {e}"
+            )
@@ -14,6 +14,7 @@ from ayon_server.types import (
 )
 
 from .anatomy import get_kitsu_project_anatomy
+from .indexes import ensure_project_kitsu_id_indexes
 
 if TYPE_CHECKING:
     from .. import KitsuAddon
@@ -127,6 +128,7 @@ async def init_pairing(
         prj_data,
         request.ayon_project_name,
     )
+    await ensure_project_kitsu_id_indexes(request.ayon_project_name)
 
     await sync_request(
         project_name=request.ayon_project_name,
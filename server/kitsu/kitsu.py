@@ -1,12 +1,41 @@
+import asyncio
+import base64
+import json
+import time
 from typing import Literal
 
 import httpx
 
+try:
+    import h2  # noqa: F401
+
+    HTTP2_SUPPORTED = True
+except ImportError:
+    HTTP2_SUPPORTED = False
+
+
+# re-login this many seconds before the access token expires
+TOKEN_EXPIRY_MARGIN = 60
+
 
 class KitsuLoginException(Exception):
     pass
 
 
+def get_token_expiry(token: str) -> float:
+    """Read the expiration time from the payload of a JWT access token
+
+    Returns 0 when the token has no readable expiration, so it is refreshed
+    on the next request.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0
+
+
 class Kitsu:
     LoginException = KitsuLoginException
 
@@ -15,14 +44,41 @@ class Kitsu:
         self.password = password
         self.base_url = server
         self.token = None
+        self.token_expires_at = 0.0
+        self._client: httpx.AsyncClient | None = None
+        self._login_lock = asyncio.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Long-lived client keeping connections to Kitsu alive"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_SUPPORTED,
+                limits=httpx.Limits(
+                    max_connections=20,
+                    max_keepalive_connections=10,
+                    keepalive_expiry=60,
+                ),
+                timeout=httpx.Timeout(30, connect=10),
+            )
+        return self._client
+
+    async def close(self):
+        """Log out and close the connection pool"""
+        try:
+            await self.logout()
+        except httpx.HTTPError:
+            pass
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def login(self):
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/api/auth/login",
-                    data={"email": self.email, "password": self.password},
-                )
+            response = await self.client.post(
+                f"{self.base_url}/api/auth/login",
+                data={"email": self.email, "password": self.password},
+            )
         except httpx.HTTPError as e:
             raise KitsuLoginException(
                 "Could not login to Kitsu (server error)"
@@ -34,42 +90,30 @@ class Kitsu:
                 "Could not login to Kitsu (invalid credentials)"
             )
         self.token = token
+        self.token_expires_at = get_token_expiry(token)
 
     async def logout(self):
         if not self.token:
             return
-        async with httpx.AsyncClient() as client:
-            await client.get(
-                f"{self.base_url}/api/auth/logout",
-                headers={"Authorization": f"Bearer {self.token}"},
-            )
-
-    async def ensure_login(self):
-        if not self.token:
-            await self.login()
-        else:
-            try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        f"{self.base_url}/api/auth/authenticated",
-                        headers={"Authorization": f"Bearer {self.token}"},
-                    )
-                    response.raise_for_status()
-            except httpx.HTTPError as e:
-                status_code = response.status_code
-                if status_code == 401:
-                    raise KitsuLoginException(
-                        "Could not login to Kitsu (invalid token)"
-                    ) from e
-                else:
-                    raise KitsuLoginException(
-                        "Could not login to Kitsu (server error)"
-                    ) from e
-
-            else:
-                return
-
-            await self.login()
+        token, self.token = self.token, None
+        self.token_expires_at = 0.0
+        await self.client.get(
+            f"{self.base_url}/api/auth/logout",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    async def ensure_login(self, force: bool = False):
+        """Log in when there is no token or it is about to expire
+
+        The token validity is taken from its JWT expiration, so no request
+        is made as long as the token is valid. `force` is used to log in
+        again when Kitsu rejected the token.
+        """
+        async with self._login_lock:
+            if force or not self.token or (
+                time.time() > self.token_expires_at - TOKEN_EXPIRY_MARGIN
+            ):
+                await self.login()
 
     async def request(
         self,
@@ -81,14 +125,18 @@ class Kitsu:
         await self.ensure_login()
         if headers is None:
             headers = {}
-        headers["Authorization"] = f"Bearer {self.token}"
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
+        for retry in (False, True):
+            if retry:
+                await self.ensure_login(force=True)
+            headers["Authorization"] = f"Bearer {self.token}"
+            response = await self.client.request(
                 method,
                 f"{self.base_url}/api/{endpoint}",
                 headers=headers,
                 **kwargs,
             )
+            if response.status_code != 401:
+                break
         return response
 
     async def get(self, endpoint: str, **kwargs) -> httpx.Response:
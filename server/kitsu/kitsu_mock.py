@@ -203,6 +203,9 @@ class KitsuMock:
         },
     ]
 
+    async def close(self):
+        pass
+
     async def request(
         self,
         method: Literal["get", "post", "put", "delete", "patch"],
@@ -1,3 +1,6 @@
+import hashlib
+import json
+import time
 from typing import TYPE_CHECKING
 
 from ayon_server.exceptions import AyonException
@@ -15,6 +18,53 @@ class PairingItemModel(OPModel):
     ayon_project_name: str | None = Field(..., title="Ayon project name")
 
 
+# seconds the pairing list is served from the cache
+PAIRING_CACHE_TTL = 30
+
+
+class PairingListCache:
+    """The last pairing list and its ETag
+
+    Pairings change when a project is paired, which invalidates the
+    cache, or outside the addon (a project renamed in Kitsu, removed in
+    Ayon), which is picked up once the TTL expires.
+    """
+
+    def __init__(self, ttl: float = PAIRING_CACHE_TTL):
+        self.ttl = ttl
+        self.items: list[PairingItemModel] | None = None
+        self.etag: str | None = None
+        self.fetched_at = 0.0
+
+    def get(self) -> tuple[list[PairingItemModel], str] | None:
+        if self.items is None or self.etag is None:
+            return None
+        if time.time() - self.fetched_at > self.ttl:
+            return None
+        return self.items, self.etag
+
+    def set(self, items: list[PairingItemModel]) -> str:
+        payload = json.dumps(
+            [item.dict() for item in items], sort_keys=True
+        )
+        self.items = items
+        self.etag = f'"{hashlib.sha1(payload.encode()).hexdigest()}"'
+        self.fetched_at = time.time()
+        return self.etag
+
+    def invalidate(self) -> None:
+        self.items = None
+        self.etag = None
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Whether the If-None-Match header lists the given ETag"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
 async def get_pairing_list(addon: "KitsuAddon") -> list[PairingItemModel]:
     #
     # Load kitsu projects
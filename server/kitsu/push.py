@@ -1,3 +1,4 @@
+import asyncio
 import json
 import time
 from typing import TYPE_CHECKING, Any, Literal, get_args
@@ -6,12 +7,19 @@ import httpx
 from nxtools import logging
 
 from ayon_server.auth.session import Session
-from ayon_server.entities import FolderEntity, ProjectEntity, UserEntity
+from ayon_server.entities import (
+    FolderEntity,
+    ProjectEntity,
+    TaskEntity,
+    UserEntity,
+)
+from ayon_server.exceptions import ForbiddenException
 from ayon_server.helpers.deploy_project import anatomy_to_project_data
 from ayon_server.lib.postgres import Postgres
 from ayon_server.types import Field, OPModel
 
 from .anatomy import get_kitsu_project_anatomy, parse_attrib
+from .folder_index import IndexedFolder, load_folder_index
 from .constants import (
     CONSTANT_KITSU_MODELS,
 )
@@ -21,11 +29,14 @@ from .utils import (
     create_task,
     delete_folder,
     delete_task,
+    dispatch_events,
     get_folder_by_kitsu_id,
+    get_folder_id_by_kitsu_id,
+    get_ids_by_kitsu_ids,
+    get_kitsu_hash,
     get_task_by_kitsu_id,
     get_user_by_kitsu_id,
     update_project,
-
     update_folder,
     update_task,
 )
@@ -35,6 +46,7 @@ from .addon_helpers import to_username, required_values
 
 if TYPE_CHECKING:
     from .. import KitsuAddon
+    from ..settings import KitsuSettings
 
 
 EntityDict = dict[str, Any]
@@ -52,15 +64,93 @@ KitsuEntityType = Literal[
 ]
 
 
+# Kitsu entity types in the order they are synced,
+#   parents are always synced before their children
+SYNC_ORDER: tuple[KitsuEntityType, ...] = (
+    "Project",
+    "Person",
+    "Episode",
+    "Sequence",
+    "Shot",
+    "Asset",
+    "Edit",
+    "Concept",
+    "Task",
+)
+
+
+# keys of a Kitsu entity referring to the entities it depends on
+DEPENDENCY_KEYS = ("parent_id", "entity_type_id", "episode_id", "entity_id")
+
+# what happened to a synced folder or task
+SyncResult = Literal["created", "updated", "skipped"]
+
+
 class PushEntitiesRequestModel(OPModel):
     project_name: str
     entities: list[EntityDict] = Field(..., title="List of entities to sync")
+    batch_size: int = Field(
+        500,
+        title="Batch size",
+        description="Number of entities synced in a single transaction",
+        gt=0,
+    )
+    session_id: str | None = Field(
+        None,
+        title="Sync session ID",
+        description="Chunks pushed with the same session ID share "
+        "the lookup tables of the session",
+    )
+    close_session: bool = Field(
+        False,
+        title="Close the sync session after this chunk",
+    )
+    aggregate_events: bool = Field(
+        False,
+        title="Aggregate events",
+        description="Dispatch one kitsu.sync.batch event per batch "
+        "instead of an event per created or updated entity",
+    )
+    concurrency: int = Field(
+        4,
+        title="Concurrency",
+        description="Number of independent batches synced at the same time",
+        gt=0,
+    )
     mock: bool | None = None  # optional param for tests
 
 
 class RemoveEntitiesRequestModel(OPModel):
     project_name: str
     entities: list[EntityDict] = Field(..., title="List of entities to remove")
+    aggregate_events: bool = Field(
+        False,
+        title="Aggregate events",
+        description="Dispatch one kitsu.sync.batch event "
+        "instead of an event per deleted entity",
+    )
+    bulk: bool = Field(
+        False,
+        title="Bulk removal",
+        description="Remove all folders and tasks in a single transaction, "
+        "children before their parents",
+    )
+
+
+class SyncedIdsModel(OPModel):
+    folders: dict[str, str] = Field(
+        default_factory=dict,
+        title="Folder types of the synced folders by their Kitsu ID",
+    )
+    tasks: list[str] = Field(
+        default_factory=list,
+        title="Kitsu IDs of the synced tasks",
+    )
+
+
+class SyncedCountModel(OPModel):
+    folders: int = Field(0, title="Number of the synced folders")
+    tasks: int = Field(0, title="Number of the synced tasks")
 
 
 async def get_root_folder_id(
@@ -70,76 +160,64 @@ async def get_root_folder_id(
     kitsu_type_id: str,
     subfolder_id: str | None = None,
     subfolder_name: str | None = None,
+    kitsu_folders: dict[str, str | None] | None = None,
+    transaction=None,
+    events: list[dict[str, Any]] | None = None,
 ) -> str:
     """
     Get the root folder ID for a given Kitsu type and ID.
     If a folder/subfolder does not exist, it will be created.
     """
-    res = await Postgres.fetch(
-        f"""
-        SELECT id FROM project_{project_name}.folders
-        WHERE data->>'kitsuId' = $1
-        """,
-        kitsu_type_id,
-    )
+    if kitsu_folders is None:
+        kitsu_folders = {}
 
-    if res:
-        id = res[0]["id"]
-    else:
+    id = await get_folder_id_by_kitsu_id(
+        project_name, kitsu_type_id, kitsu_folders, transaction
+    )
+    if id is None:
         folder = await create_folder(
             project_name=project_name,
             name=kitsu_type,
             data={"kitsuId": kitsu_type_id},
+            transaction=transaction,
+            events=events,
         )
         id = folder.id
+        kitsu_folders[kitsu_type_id] = id
 
     if not (subfolder_id or subfolder_name):
         return id
 
-    res = await Postgres.fetch(
-        f"""
-        SELECT id FROM project_{project_name}.folders
-        WHERE data->>'kitsuId' = $1
-        """,
-        subfolder_id,
+    sub_id = await get_folder_id_by_kitsu_id(
+        project_name, subfolder_id, kitsu_folders, transaction
     )
-
-    if res:
-        sub_id = res[0]["id"]
-    else:
+    if sub_id is None:
         sub_folder = await create_folder(
             project_name=project_name,
             name=subfolder_name,
             parent_id=id,
             data={"kitsuId": subfolder_id},
+            transaction=transaction,
+            events=events,
         )
         sub_id = sub_folder.id
+        kitsu_folders[subfolder_id] = sub_id
     return sub_id
 
 
 async def create_access_group(
-    addon: "KitsuAddon",
     user: "UserEntity",
-    entity_dict: "EntityDict",
-    name: str | None = None,
+    ayon_server_url: str,
+    name: str,
 ):
+    """Create the access group of synced users unless it exists"""
     try:
-        if not name:
-            settings = await addon.get_studio_settings()
-            name = settings.sync_settings.sync_users.access_group
-        session = await Session.create(user)
-        headers = {"Authorization": f"Bearer {session.token}"}
-        # Check if group already exists
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{entity_dict['ayon_server_url']}/api/accessGroups/_",
-                headers=headers,
-            )
-
-        for group in response.json():
-            if group["name"] == name:
-                # access group already exists
-                return
+        res = await Postgres.fetch(
+            "SELECT name FROM public.access_groups WHERE name = $1", name
+        )
+        if res:
+            # access group already exists
+            return
 
         # Create a new access group
         payload = json.dumps(
@@ -154,15 +232,16 @@ async def create_access_group(
                 "endpoints": {"enabled": False, "endpoints": []},
             }
         )
-
+        session = await Session.create(user)
+        headers = {"Authorization": f"Bearer {session.token}"}
         async with httpx.AsyncClient() as client:
             return await client.put(
-                f"{entity_dict['ayon_server_url']}/api/accessGroups/{name}/_",
+                f"{ayon_server_url}/api/accessGroups/{name}/_",
                 content=payload,
                 headers=headers,
             )
     except Exception as e:
-        print(e)
+        logging.error(f"Unable to create access group {name}: {e}")
 
 
 def match_ayon_roles_with_kitsu_role(role: str) -> dict[str, bool]:
@@ -189,8 +268,8 @@ def match_ayon_roles_with_kitsu_role(role: str) -> dict[str, bool]:
 async def generate_user_settings(
     addon: "KitsuAddon",
     entity_dict: "EntityDict",
+    settings: "KitsuSettings",
 ):
-    settings = await addon.get_studio_settings()
     data: dict[str, Any] = {}
     match entity_dict["role"]:
         case "admin":  # Studio manager
@@ -226,84 +305,190 @@ async def generate_user_settings(
     }
 
 
-async def sync_person(
+def get_allowed_role_flags(
+    user: "UserEntity",
+    role_flags: dict[str, bool],
+) -> dict[str, bool]:
+    """Keep the role flags the pushing user is allowed to set
+
+    Synced users are saved in-process, without the permission checks of
+    the users API. Only admins may grant or revoke admin rights and only
+    managers manager rights, a flag the user may not set is left as is.
+    """
+    allowed: dict[str, bool] = {}
+    for key, value in role_flags.items():
+        if key == "isAdmin" and not user.is_admin:
+            continue
+        if key == "isManager" and not user.is_manager:
+            continue
+        allowed[key] = value
+    return allowed
+
+
+async def get_users_by_kitsu_ids(
+    kitsu_ids: list[str],
+    usernames: list[str],
+) -> tuple[dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+    """Load the users synced from or named like the given persons
+
+    Returns the user records by their Kitsu ID and by their name.
+    """
+    by_kitsu_id: dict[str, dict[str, Any]] = {}
+    by_name: dict[str, dict[str, Any]] = {}
+    async for row in Postgres.iterate(
+        """
+        SELECT name, attrib, data FROM public.users
+        WHERE data->>'kitsuId' = ANY($1) OR name = ANY($2)
+        """,
+        kitsu_ids,
+        usernames,
+    ):
+        record = dict(row)
+        by_name[record["name"]] = record
+        if kitsu_id := (record["data"] or {}).get("kitsuId"):
+            by_kitsu_id[kitsu_id] = record
+    return by_kitsu_id, by_name
+
+
+def user_needs_update(
+    record: dict[str, Any],
+    payload: dict[str, Any],
+) -> bool:
+    attrib = record["attrib"] or {}
+    data = record["data"] or {}
+    return any(
+        attrib.get(key) != value
+        for key, value in payload["attrib"].items()
+    ) or any(
+        data.get(key) != value
+        for key, value in payload["data"].items()
+    )
+
+
+async def sync_persons(
     addon: "KitsuAddon",
     user: "UserEntity",
     existing_users: dict[str, Any],
-    entity_dict: "EntityDict",
+    entities: list["EntityDict"],
+    settings: "KitsuSettings",
 ):
+    """Sync all Kitsu persons of a push at once
 
-    first_name, entity_id= required_values(
-        entity_dict, ["first_name", "id"]
-    )
-    last_name = entity_dict.get("last_name", '')
+    The persons are diffed against their users loaded with one query,
+    unchanged users are skipped and the others are created or updated
+    in a single transaction.
+    """
+    persons: list[tuple[str, str, dict[str, Any]]] = []
+    for entity_dict in entities:
+        first_name, entity_id = required_values(
+            entity_dict, ["first_name", "id"]
+        )
+        last_name = entity_dict.get("last_name", "")
 
-    # == check should Person entity be synced ==
-    # do not sync Kitsu API bots
-    if entity_dict.get("is_bot"):
-        logging.info(
-            f"skipping sync_person for Kitsu Bot: {first_name} {last_name}"
+        # == check should Person entity be synced ==
+        # do not sync Kitsu API bots
+        if entity_dict.get("is_bot"):
+            logging.info(
+                f"skipping sync_person for Kitsu Bot: {first_name} {last_name}"
+            )
+            continue
+
+        logging.info(f"sync_person: {first_name} {last_name}")
+        username = to_username(first_name, last_name)
+
+        user_settings = await generate_user_settings(
+            addon,
+            entity_dict,
+            settings,
+        )
+        # the role flags live in the user data
+        data = user_settings.pop("data")
+        role_flags = get_allowed_role_flags(user, user_settings)
+        if role_flags != user_settings:
+            logging.warning(
+                f"{user.name} may not set the roles of {username},"
+                " keeping them unchanged"
+            )
+        data.update(role_flags)
+        data["kitsuId"] = entity_id
+        payload = {
+            "name": username,
+            "attrib": {
+                "fullName": entity_dict.get("full_name", ""),
+                "email": entity_dict.get("email", ""),
+            },
+            "data": data,
+        }
+        persons.append(
+            (entity_id, entity_dict.get("ayon_server_url", ""), payload)
         )
+
+    if not persons:
         return
 
-    logging.info(f"sync_person: {first_name} {last_name}")
-    username = to_username(first_name, last_name)
+    await create_access_group(
+        user,
+        persons[0][1],
+        settings.sync_settings.sync_users.access_group,
+    )
 
-    payload = {
-        "name": username,
-        "attrib": {
-            "fullName": entity_dict.get("full_name", ""),
-            "email": entity_dict.get("email", ""),
-        },
-    } | await generate_user_settings(
-        addon,
-        entity_dict,
+    by_kitsu_id, by_name = await get_users_by_kitsu_ids(
+        [entity_id for entity_id, _, _ in persons],
+        [payload["name"] for _, _, payload in persons],
     )
-    payload["data"]["kitsuId"] = entity_id
 
-    ayon_user = None
+    renames: list[tuple[str, str, str]] = []
+    async with Postgres.acquire() as conn:
+        async with conn.transaction():
+            for entity_id, ayon_server_url, payload in persons:
+                username = payload["name"]
+                # User exists but doesn't have a kitsuId assigned it it
+                record = by_kitsu_id.get(entity_id) or by_name.get(username)
+
+                if record is None:  # Create user
+                    new_user = UserEntity(payload)
+                    new_user.set_password(
+                        settings.sync_settings.sync_users.default_password
+                    )
+                    await new_user.save(transaction=conn)
+                    by_name[username] = payload
+
+                elif user_needs_update(record, payload):  # Update user
+                    target_user = await UserEntity.load(
+                        record["name"], transaction=conn
+                    )
+                    for key, value in payload["attrib"].items():
+                        setattr(target_user.attrib, key, value)
+                    target_user.data.update(payload["data"])
+                    await target_user.save(transaction=conn)
+
+                if record is not None and record["name"] != username:
+                    renames.append(
+                        (ayon_server_url, record["name"], username)
+                    )
+
+                # update the id map
+                existing_users[entity_id] = username
+
+    if not renames:
+        return
+
+    # Rename the users
+    # TODO: We should discourage renaming users.
+    # Maybe just change the fullName in the case there's a typo,
+    # but changing username may have weird side effects.
     try:
-        ayon_user = await UserEntity.load(username)
-    except Exception:
-        pass
-    target_user = await get_user_by_kitsu_id(entity_id)
-
-    # User exists but doesn't have a kitsuId assigned it it
-    if ayon_user and not target_user:
-        target_user = ayon_user
-
-    if target_user:  # Update user
-        try:
-            session = await Session.create(user)
-            headers = {"Authorization": f"Bearer {session.token}"}
-            ayon_server_url = entity_dict["ayon_server_url"]
-            async with httpx.AsyncClient() as client:
-                await client.patch(
-                    f"{ayon_server_url}/api/users/{target_user.name}",
-                    json=payload,
-                    headers=headers,
-                )
-            # Rename the user
-            # TODO: We should discourage renaming users.
-            # Maybe just change the fullName in the case there's a typo,
-            # but changing username may have weird side effects.
-            payload = {"newName": username}
-            async with httpx.AsyncClient() as client:
+        session = await Session.create(user)
+        headers = {"Authorization": f"Bearer {session.token}"}
+        async with httpx.AsyncClient() as client:
+            for ayon_server_url, name, new_name in renames:
                 await client.patch(
-                    f"{ayon_server_url}/api/users/{target_user.name}/rename",
-                    json=payload,
+                    f"{ayon_server_url}/api/users/{name}/rename",
+                    json={"newName": new_name},
                     headers=headers,
                 )
-        except Exception as e:
-            print(e)
-    else:  # Create user
-        user = UserEntity(payload)
-        settings = await addon.get_studio_settings()
-        user.set_password(settings.sync_settings.sync_users.default_password)
-        await user.save()
-
-    # update the id map
-    existing_users[entity_id] = username
+    except Exception as e:
+        logging.error(f"Unable to rename users: {e}")
 
 
 async def sync_project(
@@ -312,6 +497,7 @@ async def sync_project(
     project: "ProjectEntity",
     entity_dict: "EntityDict",
     mock: bool = False,
+    settings: "KitsuSettings | None" = None,
 ):
     logging.info("sync_project")
     (entity_id,) = required_values(entity_dict, ["id"])
@@ -330,7 +516,9 @@ async def sync_project(
         return
 
     await addon.ensure_kitsu(mock)
-    anatomy = await get_kitsu_project_anatomy(addon, entity_id, project)
+    anatomy = await get_kitsu_project_anatomy(
+        addon, entity_id, project, settings
+    )
     anatomy_data = anatomy_to_project_data(anatomy)
 
     await update_project(project.name, **anatomy_data)
@@ -359,12 +547,25 @@ async def sync_folder(
     project: "ProjectEntity",
     existing_folders: dict[str, Any],
     entity_dict: "EntityDict",
-):
-    target_folder = await get_folder_by_kitsu_id(
-        project.name,
-        entity_dict["id"],
-        existing_folders,
+    kitsu_folders: dict[str, str | None] | None = None,
+    transaction=None,
+    events: list[dict[str, Any]] | None = None,
+    kitsu_hash: str | None = None,
+    folder_index: dict[str, IndexedFolder] | None = None,
+) -> SyncResult | None:
+    if kitsu_folders is None:
+        kitsu_folders = {}
+    if kitsu_hash is None:
+        kitsu_hash = get_kitsu_hash(entity_dict)
+
+    target_folder = None
+    target_folder_id = await get_folder_id_by_kitsu_id(
+        project.name, entity_dict["id"], kitsu_folders, transaction
     )
+    if target_folder_id is not None:
+        target_folder = await FolderEntity.load(
+            project.name, target_folder_id, transaction=transaction
+        )
 
     # Add description to attrib data
     data: dict[str, str | int | None] | None = entity_dict.get("data", {})
@@ -374,80 +575,103 @@ async def sync_folder(
     if entity_dict.get("description"):
         data["description"] = entity_dict["description"]
     if target_folder is None:
-        parent_folder = None
         if entity_dict["type"] == "Asset":
-            if entity_dict.get("entity_type_id") in existing_folders:
-                parent_id = existing_folders[entity_dict["entity_type_id"]]
-            else:
-                parent_id = await get_root_folder_id(
-                    user=user,
-                    project_name=project.name,
-                    kitsu_type="Assets",
-                    kitsu_type_id="asset",
-                    subfolder_id=entity_dict["entity_type_id"],
-                    subfolder_name=entity_dict["asset_type_name"],
-                )
-                existing_folders[entity_dict["entity_type_id"]] = parent_id
+            parent_kitsu_id = entity_dict["entity_type_id"]
+            parent_id = await get_root_folder_id(
+                user=user,
+                project_name=project.name,
+                kitsu_type="Assets",
+                kitsu_type_id="asset",
+                subfolder_id=entity_dict["entity_type_id"],
+                subfolder_name=entity_dict["asset_type_name"],
+                kitsu_folders=kitsu_folders,
+                transaction=transaction,
+                events=events,
+            )
         elif entity_dict["type"] in get_args(KitsuEntityType):
             if entity_dict.get("parent_id") is None:
+                parent_kitsu_id = entity_dict["type"].lower()
                 parent_id = await get_root_folder_id(
                     user=user,
                     project_name=project.name,
                     kitsu_type=f"{entity_dict['type']}s",
                     kitsu_type_id=entity_dict["type"].lower(),
+                    kitsu_folders=kitsu_folders,
+                    transaction=transaction,
+                    events=events,
                 )
             else:
-                if entity_dict.get("parent_id") in existing_folders:
-                    parent_id = existing_folders[entity_dict["parent_id"]]
-                else:
-                    parent_folder = await get_folder_by_kitsu_id(
-                        project.name,
-                        entity_dict["parent_id"],
-                        existing_folders,
+                parent_kitsu_id = entity_dict["parent_id"]
+                parent_id = await get_folder_id_by_kitsu_id(
+                    project.name,
+                    entity_dict["parent_id"],
+                    kitsu_folders,
+                    transaction,
+                )
+                if parent_id is None:
+                    logging.warning(
+                        f"Parent folder for {entity_dict['type']}"
+                        f" {entity_dict['name']} not found. Skipping."  # noqa
                     )
-                    if parent_folder is None:
-                        logging.warning(
-                            f"Parent folder for {entity_dict['type']}"
-                            f" {entity_dict['name']} not found. Skipping."  # noqa
-                        )
-                        return
-                    parent_id = parent_folder.id
+                    return
         else:
             logging.warning("Unsupported entity type: ", entity_dict["type"])
             return
         # ensure folder type exists
-        if entity_dict["type"] not in [
-            f["name"]
-            for f in project.folder_types
-        ]:
-            logging.warning(
-                f"Folder type {entity_dict['type']} does not exist. Creating."
-            )
-            project.folder_types.append(
-                {"name": entity_dict["type"]}
-                | CONSTANT_KITSU_MODELS.get(entity_dict["type"], {})
-            )
-            await project.save()
+        await ensure_folder_types(project, {entity_dict["type"]})
 
         logging.info(f"Creating {entity_dict['type']} {entity_dict['name']}")
-        if not parent_folder:
-            parent_folder = await FolderEntity.load(project.name, parent_id)
+        parent = None
+        if folder_index is not None:
+            parent = folder_index.get(parent_kitsu_id)
+        if parent is not None:
+            parent_frame_start = parent.frame_start
+        else:
+            # parents missing from the index, like root folders or
+            #   folders created by other requests, are loaded once
+            parent_folder = await FolderEntity.load(
+                project.name, parent_id, transaction=transaction
+            )
+            parent_frame_start = getattr(
+                parent_folder.attrib, "frameStart", None
+            )
+            if folder_index is not None:
+                folder_index[parent_kitsu_id] = IndexedFolder(
+                    id=parent_id,
+                    frame_start=parent_frame_start,
+                    folder_type=parent_folder.folder_type,
+                )
         # Calculate the end-frame
-        data["frame_out"] = calculate_end_frame(entity_dict, parent_folder)
+        data["frame_out"] = calculate_end_frame(
+            entity_dict, parent_frame_start
+        )
 
+        attrib = parse_attrib(data)
         target_folder = await create_folder(
             project_name=project.name,
-            attrib=parse_attrib(data),
+            attrib=attrib,
             name=entity_dict["name"],
             folder_type=entity_dict["type"],
             parent_id=parent_id,
-            data={"kitsuId": entity_dict["id"]},
+            data={"kitsuId": entity_dict["id"], "kitsuHash": kitsu_hash},
+            transaction=transaction,
+            events=events,
         )
+        kitsu_folders[entity_dict["id"]] = target_folder.id
         existing_folders[entity_dict["id"]] = target_folder.id
+        if folder_index is not None:
+            folder_index[entity_dict["id"]] = IndexedFolder(
+                id=target_folder.id,
+                frame_start=attrib.get("frameStart", parent_frame_start),
+                folder_type=entity_dict["type"],
+            )
+        return "created"
 
     else:
         # Calculate the end-frame
-        data["frame_out"] = calculate_end_frame(entity_dict, target_folder)
+        data["frame_out"] = calculate_end_frame(
+            entity_dict, getattr(target_folder.attrib, "frameStart", None)
+        )
 
         changed = await update_folder(
             project_name=project.name,
@@ -455,23 +679,169 @@ async def sync_folder(
             attrib=parse_attrib(data),
             name=entity_dict["name"],
             folder_type=entity_dict["type"],
+            data={"kitsuHash": kitsu_hash},
+            folder=target_folder,
+            transaction=transaction,
+            events=events,
         )
+        if folder_index is not None:
+            # children created later in the request or session inherit
+            #   the updated frame start
+            folder_index[entity_dict["id"]] = IndexedFolder(
+                id=target_folder.id,
+                frame_start=getattr(target_folder.attrib, "frameStart", None),
+                folder_type=entity_dict["type"],
+            )
         if changed:
             logging.info(
                 f"Updating {entity_dict['type']} '{entity_dict['name']}'"
             )
             existing_folders[entity_dict["id"]] = target_folder.id
+            return "updated"
+        return "skipped"
+
+
+def get_parent_kitsu_id(entity_dict: "EntityDict") -> str:
+    """Kitsu ID of the folder a new folder is created in"""
+    if entity_dict["type"] == "Asset":
+        return entity_dict["entity_type_id"]
+    return entity_dict.get("parent_id") or entity_dict["type"].lower()
+
+
+def get_referenced_kitsu_ids(entities: list["EntityDict"]) -> set[str]:
+    """Kitsu IDs of the pushed folders and of their parents"""
+    kitsu_ids = set()
+    for entity_dict in entities:
+        kitsu_ids.add(entity_dict["id"])
+        kitsu_ids.add(get_parent_kitsu_id(entity_dict))
+    return kitsu_ids
+
+
+def get_inherited_frame_start(
+    folder_index: dict[str, IndexedFolder] | None,
+    entity_dict: "EntityDict",
+) -> int | None:
+    """Frame start of the synced folder, or of the parent of a new one"""
+    if folder_index is None:
+        return None
+    folder = folder_index.get(entity_dict["id"])
+    if folder is None:
+        folder = folder_index.get(get_parent_kitsu_id(entity_dict))
+    return folder.frame_start if folder else None
+
+
+async def sync_folder_batch(
+    addon: "KitsuAddon",
+    user: "UserEntity",
+    project: "ProjectEntity",
+    existing_folders: dict[str, Any],
+    kitsu_folders: dict[str, str | None],
+    batch: list["EntityDict"],
+    counts: dict[SyncResult, int],
+    aggregate_events: bool = False,
+    folder_index: dict[str, IndexedFolder] | None = None,
+):
+    """Sync a batch of folder entities in a single transaction
+
+    All Kitsu IDs the batch refers to (the entities, their parents and the
+    root folders) are resolved with one query up front, so the lookups
+    within the transaction are served from `kitsu_folders`. Existing
+    folders whose stored `kitsuHash` matches the pushed entity are skipped
+    without being loaded.
+    """
+    batch_ids = {entity_dict["id"] for entity_dict in batch}
+    kitsu_ids = {"asset"}
+    for entity_dict in batch:
+        kitsu_ids.add(entity_dict["type"].lower())
+        for key in ("parent_id", "entity_type_id"):
+            if entity_dict.get(key):
+                kitsu_ids.add(entity_dict[key])
+    kitsu_hashes: dict[str, str] = {}
+    kitsu_folders.update(
+        await get_ids_by_kitsu_ids(
+            project.name,
+            "folders",
+            (kitsu_ids - kitsu_folders.keys()) | batch_ids,
+            kitsu_hashes,
+        )
+    )
+
+    changed: list[tuple[EntityDict, str]] = []
+    for entity_dict in batch:
+        kitsu_hash = get_kitsu_hash(
+            entity_dict, get_inherited_frame_start(folder_index, entity_dict)
+        )
+        if kitsu_hashes.get(entity_dict["id"]) == kitsu_hash:
+            counts["skipped"] += 1
+        else:
+            changed.append((entity_dict, kitsu_hash))
+    if not changed:
+        return
+    await ensure_folder_types(project, {e["type"] for e, _ in changed})
+
+    events: list[dict[str, Any]] = []
+    async with Postgres.acquire() as conn:
+        async with conn.transaction():
+            for entity_dict, kitsu_hash in changed:
+                result = await sync_folder(
+                    addon,
+                    user,
+                    project,
+                    existing_folders,
+                    entity_dict,
+                    kitsu_folders=kitsu_folders,
+                    transaction=conn,
+                    events=events,
+                    kitsu_hash=kitsu_hash,
+                    folder_index=folder_index,
+                )
+                if result:
+                    counts[result] += 1
+    await dispatch_events(events, aggregate_events)
+
+
+async def ensure_folder_types(
+    project: "ProjectEntity",
+    folder_type_names: set[str],
+) -> bool:
+    existing = {folder_type["name"] for folder_type in project.folder_types}
+    missing = sorted(folder_type_names - existing)
+    if not missing:
+        return False
+
+    for folder_type_name in missing:
+        logging.warning(
+            f"Folder type {folder_type_name} does not exist. Creating."
+        )
+        project.folder_types.append(
+            {"name": folder_type_name}
+            | CONSTANT_KITSU_MODELS.get(folder_type_name, {})
+        )
+    await project.save()
+    return True
 
 
-async def ensure_task_type(
+async def ensure_task_anatomy(
     project: "ProjectEntity",
-    task_type_name: str,
+    task_type_names: set[str],
+    task_status_names: set[str],
 ) -> bool:
-    """#TODO: kitsu listener for new task types would be preferable"""
-    if task_type_name not in [
-        task_type["name"]
-        for task_type in project.task_types
-    ]:
+    """Create the missing task types and statuses with one project save
+
+    #TODO: kitsu listeners for new task types and statuses would be
+    preferable
+    """
+    if not (task_type_names or task_status_names):
+        return False
+
+    existing_types = {task_type["name"] for task_type in project.task_types}
+    existing_statuses = {status["name"] for status in project.statuses}
+    missing_types = sorted(task_type_names - existing_types)
+    missing_statuses = sorted(task_status_names - existing_statuses)
+    if not (missing_types or missing_statuses):
+        return False
+
+    for task_type_name in missing_types:
         logging.info(
             f"Creating task type {task_type_name} for '{project.name}'"
         )
@@ -482,21 +852,7 @@ async def ensure_task_type(
                 "icon": "task_alt",
             }
         )
-        await project.save()
-        return True
-    return False
-
-
-async def ensure_task_status(
-    project: "ProjectEntity",
-    task_status_name: str,
-) -> bool:
-    """#TODO: kitsu listener for new task statuses would be preferable"""
-
-    if task_status_name not in [
-        status["name"]
-        for status in project.statuses
-    ]:
+    for task_status_name in missing_statuses:
         logging.info(
             f"Creating task status {task_status_name} for '{project.name}'"
         )
@@ -507,9 +863,8 @@ async def ensure_task_status(
                 "shortName": task_status_name[:4],
             }
         )
-        await project.save()
-        return True
-    return False
+    await project.save()
+    return True
 
 
 async def sync_task(
@@ -519,31 +874,43 @@ async def sync_task(
     existing_tasks: dict[str, Any],
     existing_folders: dict[str, Any],
     entity_dict: "EntityDict",
-):
-    if "task_status_name" in entity_dict:
-        await ensure_task_status(project, entity_dict["task_status_name"])
-
-    if "task_type_name" in entity_dict:
-        await ensure_task_type(project, entity_dict["task_type_name"])
-
-    target_task = await get_task_by_kitsu_id(
-        project.name,
-        entity_dict["id"],
-        existing_tasks,
-    )
+    kitsu_tasks: dict[str, str | None] | None = None,
+    kitsu_folders: dict[str, str | None] | None = None,
+    transaction=None,
+    events: list[dict[str, Any]] | None = None,
+    kitsu_hash: str | None = None,
+) -> SyncResult | None:
+    if kitsu_hash is None:
+        kitsu_hash = get_kitsu_hash(entity_dict)
+
+    target_task = None
+    if kitsu_tasks is not None and entity_dict["id"] in kitsu_tasks:
+        if kitsu_tasks[entity_dict["id"]] is not None:
+            target_task = await TaskEntity.load(
+                project.name,
+                kitsu_tasks[entity_dict["id"]],
+                transaction=transaction,
+            )
+    else:
+        target_task = await get_task_by_kitsu_id(
+            project.name,
+            entity_dict["id"],
+            existing_tasks,
+        )
 
     if target_task is None:
         # Sync task
         if entity_dict.get("entity_id") in existing_folders:
             parent_id = existing_folders[entity_dict["entity_id"]]
         else:
-            parent_folder = await get_folder_by_kitsu_id(
-                project.name, entity_dict["entity_id"], existing_folders
+            parent_id = await get_folder_id_by_kitsu_id(
+                project.name,
+                entity_dict["entity_id"],
+                kitsu_folders,
+                transaction,
             )
 
-            if parent_folder:
-                parent_id = parent_folder.id
-            else:
+            if parent_id is None:
                 # The new task type haven't bin implemented in Ayon yet
                 logging.warning(
                     f"The type '{entity_dict['name']}' isn't implemented yet."
@@ -565,10 +932,15 @@ async def sync_task(
             status=entity_dict["task_status_name"],
             task_type=entity_dict["task_type_name"],
             name=entity_dict["name"],
-            data={"kitsuId": entity_dict["id"]},
+            data={"kitsuId": entity_dict["id"], "kitsuHash": kitsu_hash},
             assignees=entity_dict["assignees"],
+            transaction=transaction,
+            events=events,
         )
+        if kitsu_tasks is not None:
+            kitsu_tasks[entity_dict["id"]] = target_task.id
         existing_tasks[entity_dict["id"]] = target_task.id
+        return "created"
 
     else:
         changed = await update_task(
@@ -578,12 +950,229 @@ async def sync_task(
             assignees=entity_dict.get("assignees", target_task.assignees),
             status=entity_dict.get("task_status_name", target_task.status),
             task_type=entity_dict.get("task_type_name", target_task.task_type),
+            data={"kitsuHash": kitsu_hash},
+            task=target_task,
+            transaction=transaction,
+            events=events,
         )
         if changed:
             logging.info(
                 f"Updating {entity_dict['type']} '{entity_dict['name']}'"
             )
             existing_tasks[entity_dict["id"]] = target_task.id
+            return "updated"
+        return "skipped"
+
+
+async def sync_task_batch(
+    addon: "KitsuAddon",
+    user: "UserEntity",
+    project: "ProjectEntity",
+    existing_tasks: dict[str, Any],
+    existing_folders: dict[str, Any],
+    kitsu_folders: dict[str, str | None],
+    batch: list["EntityDict"],
+    counts: dict[SyncResult, int],
+    aggregate_events: bool = False,
+):
+    """Sync a batch of task entities in a single transaction
+
+    The tasks and their parent folders are resolved with one query each,
+    tasks with an unchanged `kitsuHash` are skipped.
+    """
+    kitsu_hashes: dict[str, str] = {}
+    kitsu_tasks = await get_ids_by_kitsu_ids(
+        project.name, "tasks", {e["id"] for e in batch}, kitsu_hashes
+    )
+
+    changed: list[tuple[EntityDict, str]] = []
+    for entity_dict in batch:
+        kitsu_hash = get_kitsu_hash(entity_dict)
+        if kitsu_hashes.get(entity_dict["id"]) == kitsu_hash:
+            counts["skipped"] += 1
+        else:
+            changed.append((entity_dict, kitsu_hash))
+    if not changed:
+        return
+
+    parent_ids = {e["entity_id"] for e, _ in changed if e.get("entity_id")}
+    kitsu_folders.update(
+        await get_ids_by_kitsu_ids(
+            project.name, "folders", parent_ids - kitsu_folders.keys()
+        )
+    )
+
+    events: list[dict[str, Any]] = []
+    async with Postgres.acquire() as conn:
+        async with conn.transaction():
+            for entity_dict, kitsu_hash in changed:
+                result = await sync_task(
+                    addon,
+                    user,
+                    project,
+                    existing_tasks,
+                    existing_folders,
+                    entity_dict,
+                    kitsu_tasks=kitsu_tasks,
+                    kitsu_folders=kitsu_folders,
+                    transaction=conn,
+                    events=events,
+                    kitsu_hash=kitsu_hash,
+                )
+                if result:
+                    counts[result] += 1
+    await dispatch_events(events, aggregate_events)
+
+
+def group_entities(
+    entities: list["EntityDict"],
+) -> dict[KitsuEntityType, list["EntityDict"]]:
+    """Group entities by their Kitsu type in the order they can be synced
+
+    Entities of unsupported types are logged and left out.
+    """
+    groups: dict[KitsuEntityType, list[EntityDict]] = {
+        kitsu_type: [] for kitsu_type in SYNC_ORDER
+    }
+    for entity_dict in entities:
+        # required fields
+        assert "type" in entity_dict
+        assert "id" in entity_dict
+
+        if entity_dict["type"] not in groups:
+            logging.warning(
+                f"Unsupported kitsu entity type: {entity_dict['type']}"
+            )
+            continue
+        groups[entity_dict["type"]].append(entity_dict)
+    return {k: v for k, v in groups.items() if v}
+
+
+def chunks(
+    entities: list["EntityDict"], size: int
+) -> list[list["EntityDict"]]:
+    return [entities[i : i + size] for i in range(0, len(entities), size)]
+
+
+def dependency_levels(
+    entities: list["EntityDict"],
+) -> list[list["EntityDict"]]:
+    """Split entities into levels which can be synced one after another
+
+    An entity is placed in the level after the entities of the payload it
+    refers to by one of the DEPENDENCY_KEYS, so the entities of a level
+    never depend on each other. A repeated entity is placed after its
+    previous occurrence.
+    """
+    by_id = {entity_dict["id"]: entity_dict for entity_dict in entities}
+    levels_by_id: dict[str, int] = {}
+
+    def get_level(entity_dict: "EntityDict", visiting: set[str]) -> int:
+        if entity_dict["id"] in levels_by_id:
+            return levels_by_id[entity_dict["id"]]
+        visiting.add(entity_dict["id"])
+        level = 0
+        for key in DEPENDENCY_KEYS:
+            dependency_id = entity_dict.get(key)
+            if dependency_id in by_id and dependency_id not in visiting:
+                level = max(
+                    level, get_level(by_id[dependency_id], visiting) + 1
+                )
+        visiting.discard(entity_dict["id"])
+        levels_by_id[entity_dict["id"]] = level
+        return level
+
+    levels: list[list[EntityDict]] = []
+    last_levels: dict[str, int] = {}
+    for entity_dict in entities:
+        level = get_level(entity_dict, set())
+        if entity_dict["id"] in last_levels:
+            level = max(level, last_levels[entity_dict["id"]] + 1)
+        last_levels[entity_dict["id"]] = level
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(entity_dict)
+    return levels
+
+
+async def run_concurrently(coroutines: list[Any], limit: int) -> None:
+    """Await the coroutines with at most `limit` of them running at once
+
+    The first failure cancels the others, which roll back their
+    transactions, and is raised once all of them have settled.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            await coroutine
+
+    tasks = [asyncio.ensure_future(run(coroutine)) for coroutine in coroutines]
+    if not tasks:
+        return
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # also when the request itself is cancelled
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # coroutines cancelled before they started
+        for coroutine in coroutines:
+            coroutine.close()
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+
+async def prepare_level(
+    user: "UserEntity",
+    project: "ProjectEntity",
+    kitsu_folders: dict[str, str | None],
+    entities: list["EntityDict"],
+):
+    """Create what the concurrent batches of a level would race for
+
+    These are the missing folder types of the project, and the root and
+    asset type folders of new folders.
+    """
+    folders = [e for e in entities if e["type"] != "Task"]
+
+    await ensure_folder_types(project, {e["type"] for e in folders})
+
+    kitsu_folders.update(
+        await get_ids_by_kitsu_ids(
+            project.name,
+            "folders",
+            {e["id"] for e in folders} - kitsu_folders.keys(),
+        )
+    )
+    for entity_dict in folders:
+        if kitsu_folders.get(entity_dict["id"]) is not None:
+            continue
+        if entity_dict["type"] == "Asset":
+            if not (
+                entity_dict.get("entity_type_id")
+                and entity_dict.get("asset_type_name")
+            ):
+                continue
+            await get_root_folder_id(
+                user=user,
+                project_name=project.name,
+                kitsu_type="Assets",
+                kitsu_type_id="asset",
+                subfolder_id=entity_dict["entity_type_id"],
+                subfolder_name=entity_dict["asset_type_name"],
+                kitsu_folders=kitsu_folders,
+            )
+        elif entity_dict.get("parent_id") is None:
+            await get_root_folder_id(
+                user=user,
+                project_name=project.name,
+                kitsu_type=f"{entity_dict['type']}s",
+                kitsu_type_id=entity_dict["type"].lower(),
+                kitsu_folders=kitsu_folders,
+            )
 
 
 async def push_entities(
@@ -600,68 +1189,285 @@ async def push_entities(
     # they are added when a task or folder is created or updated and returned
     #   by the method - useful for testing
 
-    # This object only exists during the request
-    # and speeds up the process of finding folders
-    # if multiple entities are requested to sync
-
     folders = {}
     tasks = {}
     users = {}
-
-    settings = await addon.get_studio_settings()
-    for entity_dict in payload.entities:
-        # required fields
-        assert "type" in entity_dict
-        assert "id" in entity_dict
-
-        if entity_dict["type"] not in get_args(KitsuEntityType):
-            logging.warning(
-                f"Unsupported kitsu entity type: {entity_dict['type']}"
+    counts: dict[SyncResult, int] = dict.fromkeys(get_args(SyncResult), 0)
+
+    # This lookup table maps every kitsu id resolved so far to its ayon
+    # folder id (or None when the folder does not exist). It is filled per
+    # batch with a single query and lives as long as the request or,
+    # for chunked full syncs, the sync session.
+    kitsu_folders: dict[str, str | None] = {}
+    session = None
+    if payload.session_id:
+        session = addon.sync_sessions.get(payload.session_id)
+        kitsu_folders = session.kitsu_folders
+
+    # settings are resolved once per request or sync session and passed
+    #   down to everything synced by it
+    if session is not None and session.settings is not None:
+        settings = session.settings
+    else:
+        settings = await addon.get_settings_snapshot()
+        if session is not None:
+            session.settings = settings
+    groups = group_entities(payload.entities)
+    for kitsu_type, entities in groups.items():
+        if kitsu_type == "Project":
+            for entity_dict in entities:
+                await sync_project(
+                    addon, user, project, entity_dict, payload.mock, settings
+                )
+        elif kitsu_type == "Person":
+            if not settings.sync_settings.sync_users.enabled:
+                continue
+            await sync_persons(
+                addon,
+                user,
+                users,
+                entities,
+                settings,
             )
-            continue
 
-        if entity_dict["type"] == "Project":
-            await sync_project(
-                addon, user, project, entity_dict, payload.mock
+    # folders and tasks are synced level by level, the independent
+    #   batches of a level concurrently
+    hierarchy = [
+        entity_dict
+        for kitsu_type, entities in groups.items()
+        if kitsu_type not in ("Project", "Person")
+        for entity_dict in entities
+    ]
+
+    # parents and their frame start are resolved from this index of the
+    #   synced folders. A sync session loads all of them once, a single
+    #   request only the folders it pushes and their parents.
+    folder_index = None
+    hierarchy_folders = [e for e in hierarchy if e["type"] != "Task"]
+    if hierarchy_folders:
+        if session is not None and session.folder_index is not None:
+            folder_index = session.folder_index
+        elif session is not None:
+            folder_index = await load_folder_index(project)
+            session.folder_index = folder_index
+        else:
+            folder_index = await load_folder_index(
+                project, get_referenced_kitsu_ids(hierarchy_folders)
             )
-        elif entity_dict["type"] == "Person":
-            if settings.sync_settings.sync_users.enabled:
-                await create_access_group(
+        kitsu_folders.update(
+            {kitsu_id: folder.id for kitsu_id, folder in folder_index.items()}
+        )
+    # the task types and statuses of all tasks are created up front, so
+    #   the project is saved at most once per request
+    hierarchy_tasks = [e for e in hierarchy if e["type"] == "Task"]
+    if hierarchy_tasks:
+        await ensure_task_anatomy(
+            project,
+            {e.get("task_type_name") for e in hierarchy_tasks} - {None},
+            {e.get("task_status_name") for e in hierarchy_tasks} - {None},
+        )
+    for level in dependency_levels(hierarchy):
+        await prepare_level(user, project, kitsu_folders, level)
+        batches = []
+        for batch in chunks(
+            [e for e in level if e["type"] != "Task"], payload.batch_size
+        ):
+            batches.append(
+                sync_folder_batch(
                     addon,
                     user,
-                    entity_dict,
+                    project,
+                    folders,
+                    kitsu_folders,
+                    batch,
+                    counts,
+                    payload.aggregate_events,
+                    folder_index,
                 )
-                await sync_person(
+            )
+        for batch in chunks(
+            [e for e in level if e["type"] == "Task"], payload.batch_size
+        ):
+            batches.append(
+                sync_task_batch(
                     addon,
                     user,
-                    users,
-                    entity_dict,
+                    project,
+                    tasks,
+                    folders,
+                    kitsu_folders,
+                    batch,
+                    counts,
+                    payload.aggregate_events,
                 )
-        elif entity_dict["type"] != "Task":
-            await sync_folder(
-                addon,
-                user,
-                project,
-                folders,
-                entity_dict,
-            )
-        else:
-            await sync_task(
-                addon,
-                user,
-                project,
-                tasks,
-                folders,
-                entity_dict,
             )
+        await run_concurrently(batches, payload.concurrency)
 
     logging.info(
         f"Synced {len(payload.entities)}"
         f" entities in {time.time() - start_time}s"
+        f" ({counts['created']} created, {counts['updated']} updated,"
+        f" {counts['skipped']} skipped)"
     )
 
     # pass back the map of kitsu to ayon ids
-    return {"folders": folders, "tasks": tasks, "users": users}
+    result = {
+        "folders": folders,
+        "tasks": tasks,
+        "users": users,
+        "counts": counts,
+    }
+
+    if session is not None:
+        session.chunks += 1
+        session.entities += len(payload.entities)
+        result["session"] = session.summary()
+        logging.info(
+            f"Sync session {session.id}: chunk {session.chunks} done,"
+            f" {session.entities} entities synced"
+        )
+        if payload.close_session:
+            addon.sync_sessions.close(session.id)
+    return result
+
+
+async def get_synced_ids(project_name: str) -> SyncedIdsModel:
+    """Kitsu IDs of all the folders and tasks synced to the project
+
+    Used by the processor to find the entities deleted in Kitsu without
+    having to sync the whole project again.
+    """
+    project = await ProjectEntity.load(project_name)
+    result = SyncedIdsModel()
+    async for row in Postgres.iterate(
+        f"""
+        SELECT data->>'kitsuId' AS kitsu_id, folder_type
+        FROM project_{project.name}.folders
+        WHERE data ? 'kitsuId'
+        """
+    ):
+        result.folders[row["kitsu_id"]] = row["folder_type"]
+    async for row in Postgres.iterate(
+        f"""
+        SELECT data->>'kitsuId' AS kitsu_id
+        FROM project_{project.name}.tasks
+        WHERE data ? 'kitsuId'
+        """
+    ):
+        result.tasks.append(row["kitsu_id"])
+    return result
+
+
+async def get_synced_count(project_name: str) -> SyncedCountModel:
+    """Number of the folders and tasks synced to the project
+
+    Used by the processor to order the projects of the startup sync
+    without downloading all their Kitsu IDs.
+    """
+    project = await ProjectEntity.load(project_name)
+    res = await Postgres.fetch(
+        f"""
+        SELECT
+            (SELECT COUNT(*) FROM project_{project.name}.folders
+             WHERE data ? 'kitsuId') AS folders,
+            (SELECT COUNT(*) FROM project_{project.name}.tasks
+             WHERE data ? 'kitsuId') AS tasks
+        """
+    )
+    return SyncedCountModel(folders=res[0]["folders"], tasks=res[0]["tasks"])
+
+
+async def remove_entities_bulk(
+    user: "UserEntity",
+    project: "ProjectEntity",
+    entities: list["EntityDict"],
+    folders: dict[str, str],
+    tasks: dict[str, str],
+    aggregate_events: bool = False,
+) -> dict[str, str]:
+    """Remove folders and tasks in a single transaction
+
+    All Kitsu IDs are resolved up front and the delete access is checked
+    once for the batch. Tasks are deleted first, then the folders from
+    the deepest one up. Every entity is deleted in its own savepoint, so
+    a failing one is reported without rolling back the others.
+
+    Returns the result of every requested Kitsu ID: `deleted`,
+    `not_found` or the error of a failed delete.
+    """
+    # managers may delete anything in the project
+    if not user.is_manager:
+        raise ForbiddenException("Only managers can sync Kitsu projects")
+
+    task_ids = await get_ids_by_kitsu_ids(
+        project.name,
+        "tasks",
+        {e["id"] for e in entities if e["type"] == "Task"},
+    )
+    folder_ids = await get_ids_by_kitsu_ids(
+        project.name,
+        "folders",
+        {e["id"] for e in entities if e["type"] != "Task"},
+    )
+    results = {
+        kitsu_id: "not_found"
+        for kitsu_id, entity_id in (task_ids | folder_ids).items()
+        if entity_id is None
+    }
+
+    # children are deleted before their parents
+    res = await Postgres.fetch(
+        f"""
+        SELECT id, parent_id FROM project_{project.name}.folders
+        WHERE id = ANY($1)
+        """,
+        [id for id in folder_ids.values() if id],
+    )
+    parents = {row["id"]: row["parent_id"] for row in res}
+
+    def get_depth(folder_id: str) -> int:
+        depth = 0
+        while parents.get(folder_id) in parents:
+            folder_id = parents[folder_id]
+            depth += 1
+        return depth
+
+    deletes = [
+        (kitsu_id, task_id, delete_task, tasks)
+        for kitsu_id, task_id in task_ids.items()
+        if task_id
+    ] + [
+        (kitsu_id, folder_id, delete_folder, folders)
+        for kitsu_id, folder_id in sorted(
+            folder_ids.items(),
+            key=lambda item: get_depth(item[1]) if item[1] else 0,
+            reverse=True,
+        )
+        if folder_id
+    ]
+
+    events: list[dict[str, Any]] = []
+    async with Postgres.acquire() as conn:
+        async with conn.transaction():
+            for kitsu_id, entity_id, delete, deleted in deletes:
+                try:
+                    async with conn.transaction():
+                        await delete(
+                            project.name,
+                            entity_id,
+                            user,
+                            events=events,
+                            transaction=conn,
+                            check_access=False,
+                        )
+                except Exception as e:
+                    logging.error(f"Unable to delete {kitsu_id}: {e}")
+                    results[kitsu_id] = f"failed: {e}"
+                    continue
+                results[kitsu_id] = "deleted"
+                deleted[kitsu_id] = entity_id
+    await dispatch_events(events, aggregate_events)
+    return results
 
 
 async def remove_entities(
@@ -677,8 +1483,16 @@ async def remove_entities(
     #   by the method - useful for testing
     folders = {}
     tasks = {}
+    # deletions are not rolled back, so their events are only held back
+    #   when they are aggregated
+    events: list[dict[str, Any]] | None = None
+    if payload.aggregate_events:
+        events = []
+
+    # folders and tasks removed in bulk
+    bulk_entities: list[EntityDict] = []
 
-    settings = await addon.get_studio_settings()
+    settings = await addon.get_settings_snapshot()
     for entity_dict in payload.entities:
         if entity_dict["type"] not in get_args(KitsuEntityType):
             logging.warning(
@@ -686,7 +1500,10 @@ async def remove_entities(
             )
             continue
 
-        if entity_dict["type"] == "Project":
+        if payload.bulk and entity_dict["type"] not in ("Project", "Person"):
+            bulk_entities.append(entity_dict)
+
+        elif entity_dict["type"] == "Project":
             if settings.delete_ayon_projects.enabled:
                 await update_project(
                     addon,
@@ -714,6 +1531,7 @@ async def remove_entities(
                 project_name=project.name,
                 task_id=task.id,
                 user=user,
+                events=events,
             )
             logging.info(f"Deleted {entity_dict['type']} '{task.name}'")
             tasks[entity_dict["id"]] = task.id
@@ -731,14 +1549,29 @@ async def remove_entities(
                 project_name=project.name,
                 folder_id=folder.id,
                 user=user,
+                events=events,
             )
             logging.info(f"Deleted {entity_dict['type']} '{folder.name}'")
             folders[entity_dict["id"]] = folder.id
 
+    if events:
+        await dispatch_events(events, aggregate=True)
+
+    result: dict[str, dict[Any, Any]] = {"folders": folders, "tasks": tasks}
+    if bulk_entities:
+        result["results"] = await remove_entities_bulk(
+            user,
+            project,
+            bulk_entities,
+            folders,
+            tasks,
+            payload.aggregate_events,
+        )
+
     logging.info(
         f"Deleted {len(payload.entities)} entities"
         f" in {time.time() - start_time}s"
     )
 
     # pass back the map of kitsu to ayon ids
-    return {"folders": folders, "tasks": tasks}
+    return result
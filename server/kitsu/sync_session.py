@@ -0,0 +1,59 @@
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..settings import KitsuSettings
+    from .folder_index import IndexedFolder
+
+# sessions which have not received a chunk for this long are dropped
+SESSION_TIMEOUT = 600
+
+
+class SyncSession:
+    """State shared by the chunks pushed during one full sync
+
+    Sessions only live in the memory of the server process and act as a
+    cache: a chunk arriving without its session (another server worker,
+    an expired session) starts a new one and resolves the Kitsu ids from
+    the database again.
+    """
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.kitsu_folders: dict[str, str | None] = {}
+        self.folder_index: dict[str, "IndexedFolder"] | None = None
+        self.settings: "KitsuSettings | None" = None
+        self.chunks = 0
+        self.entities = 0
+        self.started_at = time.time()
+        self.last_used = time.time()
+
+    def summary(self) -> dict[str, str | int | float]:
+        return {
+            "id": self.id,
+            "chunks": self.chunks,
+            "entities": self.entities,
+            "duration": time.time() - self.started_at,
+        }
+
+
+class SyncSessions:
+    def __init__(self):
+        self._sessions: dict[str, SyncSession] = {}
+
+    def get(self, session_id: str) -> SyncSession:
+        self.expire()
+        if session_id not in self._sessions:
+            self._sessions[session_id] = SyncSession(session_id)
+        session = self._sessions[session_id]
+        session.last_used = time.time()
+        return session
+
+    def close(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def expire(self) -> None:
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_used > SESSION_TIMEOUT:
+                del self._sessions[session_id]
@@ -1,3 +1,5 @@
+import hashlib
+import json
 from typing import Any
 
 from nxtools import slugify, logging
@@ -13,8 +15,12 @@ from ayon_server.lib.postgres import Postgres
 
 
 def calculate_end_frame(
-    entity_dict: dict[str, int], folder: FolderEntity
+    entity_dict: dict[str, int], frame_start: int | None = None
 ) -> int | None:
+    """Calculate the end-frame of a Kitsu entity
+
+    `frame_start` of the Ayon folder is used when Kitsu has no frame in.
+    """
     # for concepts data=None
     if "data" not in entity_dict or not isinstance(entity_dict["data"], dict):
         return
@@ -28,14 +34,42 @@ def calculate_end_frame(
         entity_dict.get("nb_frames")
         and not entity_dict["data"].get("frame_out")
     ):
-        frame_start = entity_dict["data"].get("frame_in")
-        # If kitsu doesn't have a frame in, get it from the folder in Ayon
-        if frame_start is None and hasattr(folder.attrib, "frameStart"):
-            frame_start = folder.attrib.frameStart
+        # Use the frame in of kitsu over the one of the folder in Ayon
+        if entity_dict["data"].get("frame_in") is not None:
+            frame_start = entity_dict["data"].get("frame_in")
         if frame_start is not None:
             return int(frame_start) + int(entity_dict["nb_frames"]) - 1
 
 
+# keys of the pushed entities that do not describe the Kitsu entity itself
+HASH_IGNORED_KEYS = ("ayon_server_url", "created_at", "updated_at")
+
+
+def get_kitsu_hash(
+    entity_dict: dict[str, Any], frame_start: int | None = None
+) -> str:
+    """Stable hash of the normalized payload of a pushed Kitsu entity
+
+    The hash is stored as `kitsuHash` in the data of the synced entity,
+    an entity pushed again with the same hash has nothing to update.
+
+    `frame_start` is the frame start the folder inherits in Ayon. It is
+    part of the hash when the end frame is calculated from it, so the
+    folder is synced again when the frame start of a parent changes.
+    """
+    payload = {
+        key: value
+        for key, value in entity_dict.items()
+        if key not in HASH_IGNORED_KEYS
+    }
+    if frame_start is not None and calculate_end_frame(
+        entity_dict
+    ) != calculate_end_frame(entity_dict, frame_start):
+        payload["ayon_frame_start"] = frame_start
+    normalized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
 def create_name_and_label(kitsu_name: str) -> dict[str, str]:
     """From a name coming from kitsu, create a name and label"""
     name_slug = slugify(kitsu_name, separator="_")
@@ -56,6 +90,69 @@ async def get_user_by_kitsu_id(
     return user
 
 
+async def get_ids_by_kitsu_ids(
+    project_name: str,
+    table: str,
+    kitsu_ids: list[str] | set[str],
+    kitsu_hashes: dict[str, str] | None = None,
+) -> dict[str, str | None]:
+    """Map Kitsu IDs to Ayon entity IDs of the given table in one query
+
+    Every requested Kitsu ID is present in the result, the ones without
+    a matching Ayon entity map to None. This makes the result usable as an
+    authoritative lookup table for the whole batch.
+
+    The stored `kitsuHash` of the found entities is added to
+    `kitsu_hashes` when it is given.
+    """
+    result: dict[str, str | None] = {kitsu_id: None for kitsu_id in kitsu_ids}
+    if not result:
+        return result
+
+    res = await Postgres.fetch(
+        f"""
+        SELECT id, data->>'kitsuId' AS kitsu_id,
+            data->>'kitsuHash' AS kitsu_hash
+        FROM project_{project_name}.{table}
+        WHERE data->>'kitsuId' = ANY($1)
+        """,
+        list(result),
+    )
+    for row in res:
+        result[row["kitsu_id"]] = row["id"]
+        if kitsu_hashes is not None and row["kitsu_hash"]:
+            kitsu_hashes[row["kitsu_id"]] = row["kitsu_hash"]
+    return result
+
+
+async def get_folder_id_by_kitsu_id(
+    project_name: str,
+    kitsu_id: str,
+    kitsu_folders: dict[str, str | None] | None = None,
+    transaction=None,
+) -> str | None:
+    """Get an Ayon folder ID by its Kitsu ID
+
+    Prefetched ids in `kitsu_folders` are used when available, a missing
+    folder is remembered there as None.
+    """
+    if kitsu_folders is not None and kitsu_id in kitsu_folders:
+        return kitsu_folders[kitsu_id]
+
+    fetch = transaction.fetch if transaction else Postgres.fetch
+    res = await fetch(
+        f"""
+        SELECT id FROM project_{project_name}.folders
+        WHERE data->>'kitsuId' = $1
+        """,
+        kitsu_id,
+    )
+    folder_id = res[0]["id"] if res else None
+    if kitsu_folders is not None:
+        kitsu_folders[kitsu_id] = folder_id
+    return folder_id
+
+
 async def get_folder_by_kitsu_id(
     project_name: str,
     kitsu_id: str,
@@ -106,9 +203,59 @@ async def get_task_by_kitsu_id(
     return await TaskEntity.load(project_name, folder_id)
 
 
+async def emit_event(
+    event: dict[str, Any],
+    events: list[dict[str, Any]] | None = None,
+) -> None:
+    """Dispatch the event now or queue it when `events` is given
+
+    Queued events are dispatched by `dispatch_events` once the transaction
+    writing the entities has been committed.
+    """
+    if events is None:
+        await dispatch_event(**event)
+    else:
+        events.append(event)
+
+
+def aggregate_events(events: list[dict[str, Any]]) -> dict[str, Any]:
+    """Merge queued entity events into one `kitsu.sync.batch` event
+
+    The summary lists the ids of the affected entities by action and
+    entity type, e.g. `{"created": {"folder": [...]}}`.
+    """
+    summary: dict[str, dict[str, list[str]]] = {}
+    for event in events:
+        # entity.{entity_type}.{action}
+        _, entity_type, action = event["topic"].split(".")
+        ids = summary.setdefault(action, {}).setdefault(entity_type, [])
+        ids.append(event["summary"]["entityId"])
+    return {
+        "topic": "kitsu.sync.batch",
+        "description": f"Kitsu sync changed {len(events)} entities",
+        "summary": summary,
+        "project": events[0]["project"],
+    }
+
+
+async def dispatch_events(
+    events: list[dict[str, Any]],
+    aggregate: bool = False,
+) -> None:
+    """Dispatch the queued events, optionally as one aggregated event"""
+    if aggregate and events:
+        await dispatch_event(**aggregate_events(events))
+    else:
+        for event in events:
+            await dispatch_event(**event)
+    events.clear()
+
+
 async def create_folder(
     project_name: str,
     name: str,
+    transaction=None,
+    events: list[dict[str, Any]] | None = None,
     **kwargs,
 ) -> FolderEntity:
     """
@@ -122,25 +269,43 @@ async def create_folder(
         project_name=project_name,
         payload=payload,
     )
-    await folder.save()
+    await folder.save(transaction=transaction)
     event = {
         "topic": "entity.folder.created",
         "description": f"Folder {folder.name} created",
         "summary": {"entityId": folder.id, "parentId": folder.parent_id},
         "project": project_name,
     }
-
-    await dispatch_event(**event)
+    await emit_event(event, events)
     return folder
 
 
+def update_data(
+    entity: FolderEntity | TaskEntity,
+    data: dict[str, Any] | None,
+) -> bool:
+    """Merge `data` into the data of the entity, return True on change"""
+    changed = False
+    for key, value in (data or {}).items():
+        if entity.data.get(key) != value:
+            entity.data[key] = value
+            changed = True
+    return changed
+
+
 async def update_folder(
     project_name: str,
     folder_id: str,
     name: str,
+    folder: FolderEntity | None = None,
+    transaction=None,
+    events: list[dict[str, Any]] | None = None,
     **kwargs,
 ) -> bool:
-    folder = await FolderEntity.load(project_name, folder_id)
+    if folder is None:
+        folder = await FolderEntity.load(
+            project_name, folder_id, transaction=transaction
+        )
     changed = False
 
     payload: dict[str, Any] = {**kwargs, **create_name_and_label(name)}
@@ -156,15 +321,19 @@ async def update_folder(
             if key not in folder.own_attrib:
                 folder.own_attrib.append(key)
             changed = True
+
+    # sync bookkeeping in data is saved without dispatching an event
+    data_changed = update_data(folder, payload.get("data"))
+    if changed or data_changed:
+        await folder.save(transaction=transaction)
     if changed:
-        await folder.save()
         event = {
             "topic": "entity.folder.updated",
             "description": f"Folder {folder.name} updated",
             "summary": {"entityId": folder.id, "parentId": folder.parent_id},
             "project": project_name,
         }
-        await dispatch_event(**event)
+        await emit_event(event, events)
 
     return changed
 
@@ -173,26 +342,34 @@ async def delete_folder(
     project_name: str,
     folder_id: str,
     user: "UserEntity",
+    events: list[dict[str, Any]] | None = None,
+    transaction=None,
+    check_access: bool = True,
     **kwargs,
 ) -> None:
-    folder = await FolderEntity.load(project_name, folder_id)
+    folder = await FolderEntity.load(
+        project_name, folder_id, transaction=transaction
+    )
 
     # do we need this?
-    await folder.ensure_delete_access(user)
+    if check_access:
+        await folder.ensure_delete_access(user)
 
-    await folder.delete()
+    await folder.delete(transaction=transaction)
     event = {
         "topic": "entity.folder.deleted",
         "description": f"Folder {folder.name} deleted",
         "summary": {"entityId": folder.id, "parentId": folder.parent_id},
         "project": project_name,
     }
-    await dispatch_event(**event)
+    await emit_event(event, events)
 
 
 async def create_task(
     project_name: str,
     name: str,
+    transaction=None,
+    events: list[dict[str, Any]] | None = None,
     **kwargs,
 ) -> TaskEntity:
     payload = {**kwargs, **create_name_and_label(name)}
@@ -201,14 +378,14 @@ async def create_task(
         payload=payload,
     )
 
-    await task.save()
+    await task.save(transaction=transaction)
     event = {
         "topic": "entity.task.created",
         "description": f"Task {task.name} created",
         "summary": {"entityId": task.id, "parentId": task.parent_id},
         "project": project_name,
     }
-    await dispatch_event(**event)
+    await emit_event(event, events)
     return task
 
 
@@ -216,9 +393,15 @@ async def update_task(
     project_name: str,
     task_id: str,
     name: str,
+    task: TaskEntity | None = None,
+    transaction=None,
+    events: list[dict[str, Any]] | None = None,
     **kwargs,
 ) -> bool:
-    task = await TaskEntity.load(project_name, task_id)
+    if task is None:
+        task = await TaskEntity.load(
+            project_name, task_id, transaction=transaction
+        )
     changed = False
 
     payload = {**kwargs, **create_name_and_label(name)}
@@ -235,15 +418,19 @@ async def update_task(
                 if key not in task.own_attrib:
                     task.own_attrib.append(key)
                 changed = True
+
+    # sync bookkeeping in data is saved without dispatching an event
+    data_changed = update_data(task, payload.get("data"))
+    if changed or data_changed:
+        await task.save(transaction=transaction)
     if changed:
-        await task.save()
         event = {
             "topic": "entity.task.updated",
             "description": f"Task {task.name} updated",
             "summary": {"entityId": task.id, "parentId": task.parent_id},
             "project": project_name,
         }
-        await dispatch_event(**event)
+        await emit_event(event, events)
     return changed
 
 
@@ -251,21 +438,27 @@ async def delete_task(
     project_name: str,
     task_id: str,
     user: "UserEntity",
+    events: list[dict[str, Any]] | None = None,
+    transaction=None,
+    check_access: bool = True,
     **kwargs,
 ) -> None:
-    task = await TaskEntity.load(project_name, task_id)
+    task = await TaskEntity.load(
+        project_name, task_id, transaction=transaction
+    )
 
     # do we need this?
-    await task.ensure_delete_access(user)
+    if check_access:
+        await task.ensure_delete_access(user)
 
-    await task.delete()
+    await task.delete(transaction=transaction)
     event = {
         "topic": "entity.task.deleted",
         "description": f"Task {task.name} deleted",
         "summary": {"entityId": task.id, "parentId": task.parent_id},
         "project": project_name,
     }
-    await dispatch_event(**event)
+    await emit_event(event, events)
 
 
 async def update_project(
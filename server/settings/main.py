@@ -3,6 +3,7 @@ from ayon_server.settings.enum import secrets_enum
 
 from .sync_settings import SyncSettings, SYNC_DEFAULT_VALUES
 from .publish_plugins import PublishPlugins, PUBLISH_DEFAULT_VALUES
+from .service_settings import ServiceSettings, SERVICE_DEFAULT_VALUES
 
 
 ## Entities naming pattern
@@ -51,6 +52,10 @@ class KitsuSettings(BaseSettingsModel):
         default_factory=SyncSettings,
         title="Sync settings",
     )
+    service_settings: ServiceSettings = SettingsField(
+        default_factory=ServiceSettings,
+        title="Service settings",
+    )
 
 
 DEFAULT_VALUES = {
@@ -61,4 +66,5 @@ DEFAULT_VALUES = {
     },
     "publish": PUBLISH_DEFAULT_VALUES,
     "sync_settings": SYNC_DEFAULT_VALUES,
+    "service_settings": SERVICE_DEFAULT_VALUES,
 }
@@ -0,0 +1,77 @@
+from ayon_server.settings import BaseSettingsModel, SettingsField
+
+
+def _startup_sync_order_enum():
+    return [
+        {"value": "pairing", "label": "Pairing order"},
+        {"value": "largest_first", "label": "Largest projects first"},
+    ]
+
+
+class ServiceSettings(BaseSettingsModel):
+    """Settings of the Kitsu processor service"""
+
+    sync_chunk_size: int = SettingsField(
+        500,
+        title="Full sync chunk size",
+        description="Number of entities pushed to Ayon in one request during a full sync",
+        ge=1,
+    )
+    sync_aggregate_events: bool = SettingsField(
+        False,
+        title="Aggregate full sync events",
+        description="Dispatch one kitsu.sync.batch event per pushed chunk instead of an event per synced entity",
+    )
+    sync_job_workers: int = SettingsField(
+        2,
+        title="Sync job workers",
+        description="Number of project sync requests handled in parallel",
+        ge=1,
+    )
+    event_workers: int = SettingsField(
+        4,
+        title="Event workers",
+        description="Number of Kitsu events handled in parallel. The events of one project are handled in order by a single worker, so only events of different projects run in parallel",
+        ge=1,
+    )
+    event_queue_size: int = SettingsField(
+        1000,
+        title="Event queue size",
+        description="Number of Kitsu events each worker can hold before the event listener has to wait",
+        ge=1,
+    )
+    event_coalesce_window: float = SettingsField(
+        0.5,
+        title="Event coalescing window",
+        description="Seconds to collect the Kitsu events of a project before they are synced together, 0 syncs every event on its own",
+        ge=0,
+    )
+    startup_sync_workers: int = SettingsField(
+        4,
+        title="Startup sync workers",
+        description="Number of paired projects synced in parallel when the service starts",
+        ge=1,
+    )
+    startup_sync_order: str = SettingsField(
+        "pairing",
+        enum_resolver=_startup_sync_order_enum,
+        title="Startup sync order",
+    )
+    startup_sync_priority: list[str] = SettingsField(
+        default_factory=list,
+        title="Startup sync priority",
+        description="Ayon projects synced before all the others, in this order",
+    )
+
+
+SERVICE_DEFAULT_VALUES = {
+    "sync_chunk_size": 500,
+    "sync_aggregate_events": False,
+    "sync_job_workers": 2,
+    "event_workers": 4,
+    "event_queue_size": 1000,
+    "event_coalesce_window": 0.5,
+    "startup_sync_workers": 4,
+    "startup_sync_order": "pairing",
+    "startup_sync_priority": [],
+}
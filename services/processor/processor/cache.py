@@ -0,0 +1,128 @@
+""" caches shared by the processor threads """
+
+import threading
+import time
+
+import ayon_api
+import gazu
+
+
+def get_ayon_users() -> dict[str, str]:
+    """Map the email of every Ayon user to its username"""
+    return {
+        user["attrib"]["email"]: user["name"] for user in ayon_api.get_users()
+    }
+
+
+def get_asset_types(kitsu_project_id: str) -> dict[str, str]:
+    raw_asset_types = gazu.asset.all_asset_types_for_project(kitsu_project_id)
+    kitsu_asset_types = {}
+    for asset_type in raw_asset_types:
+        kitsu_asset_types[asset_type["id"]] = asset_type["name"]
+    return kitsu_asset_types
+
+
+def get_task_types(kitsu_project_id: str) -> dict[str, str]:
+    raw_task_types = gazu.task.all_task_types_for_project(kitsu_project_id)
+    kitsu_task_types = {}
+    for task_type in raw_task_types:
+        kitsu_task_types[task_type["id"]] = task_type["name"]
+    return kitsu_task_types
+
+
+def get_statuses() -> dict[str, str]:
+    raw_statuses = gazu.task.all_task_statuses()
+    kitsu_statuses = {}
+    for status in raw_statuses:
+        kitsu_statuses[status["id"]] = status["name"]
+    return kitsu_statuses
+
+
+class UserDirectory:
+    """Ayon users by email, fetched at most once per `ttl` seconds
+
+    Kitsu person events invalidate the directory, so new or renamed users
+    are picked up with the next task.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._users: dict[str, str] | None = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> dict[str, str]:
+        """Returns a snapshot of the directory"""
+        with self._lock:
+            if (
+                self._users is None
+                or time.time() - self._fetched_at > self.ttl
+            ):
+                self._users = get_ayon_users()
+                self._fetched_at = time.time()
+            return self._users
+
+    def invalidate(self):
+        with self._lock:
+            self._users = None
+
+
+class ProjectMetadata:
+    """Kitsu asset types, task types and task statuses by their id
+
+    The lookup tables are fetched once per project and dropped by the
+    matching Kitsu `asset-type:*`, `task-type:*` and `task-status:*`
+    events. A table without a requested id is fetched again, in case its
+    event has not arrived yet.
+    """
+
+    def __init__(self):
+        self._asset_types: dict[str, dict[str, str]] = {}
+        self._task_types: dict[str, dict[str, str]] = {}
+        self._statuses: dict[str, str] | None = None
+        self._lock = threading.Lock()
+
+    def get_asset_types(
+        self, kitsu_project_id: str, required_id: str | None = None
+    ) -> dict[str, str]:
+        with self._lock:
+            asset_types = self._asset_types.get(kitsu_project_id)
+            if asset_types is None or (
+                required_id and required_id not in asset_types
+            ):
+                asset_types = get_asset_types(kitsu_project_id)
+                self._asset_types[kitsu_project_id] = asset_types
+            return asset_types
+
+    def get_task_types(
+        self, kitsu_project_id: str, required_id: str | None = None
+    ) -> dict[str, str]:
+        with self._lock:
+            task_types = self._task_types.get(kitsu_project_id)
+            if task_types is None or (
+                required_id and required_id not in task_types
+            ):
+                task_types = get_task_types(kitsu_project_id)
+                self._task_types[kitsu_project_id] = task_types
+            return task_types
+
+    def get_statuses(self, required_id: str | None = None) -> dict[str, str]:
+        with self._lock:
+            if self._statuses is None or (
+                required_id and required_id not in self._statuses
+            ):
+                self._statuses = get_statuses()
+            return self._statuses
+
+    def invalidate_asset_types(self):
+        # asset types are shared by the projects
+        with self._lock:
+            self._asset_types.clear()
+
+    def invalidate_task_types(self):
+        with self._lock:
+            self._task_types.clear()
+
+    def invalidate_statuses(self):
+        with self._lock:
+            self._statuses = None
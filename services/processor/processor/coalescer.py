@@ -0,0 +1,52 @@
+import threading
+from typing import Callable
+
+# (entity type, action, event data) of a Kitsu event
+KitsuEvent = tuple[str, str, dict[str, str]]
+
+
+class EventCoalescer:
+    """Collects the Kitsu events of a project for a short window
+
+    The first event of a project opens a window of `window` seconds.
+    Repeated events of one entity within the window are merged, the last
+    action wins, and `flush` is called with the project id and the
+    surviving events once the window closes.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        flush: Callable[[str, list[KitsuEvent]], None],
+    ):
+        self.window = window
+        self.flush = flush
+        self.pending: dict[str, dict[tuple[str, str], KitsuEvent]] = {}
+        self.lock = threading.Lock()
+
+    def add(
+        self,
+        project_id: str,
+        entity_type: str,
+        action: str,
+        data: dict[str, str],
+    ):
+        entity_key = (entity_type, data[f"{entity_type}_id"])
+        with self.lock:
+            if project_id not in self.pending:
+                self.pending[project_id] = {}
+                timer = threading.Timer(
+                    self.window, self.close_window, args=(project_id,)
+                )
+                timer.daemon = True
+                timer.start()
+            events = self.pending[project_id]
+            # keep the position of the first event, so the entities are
+            #   still synced in the order they were created
+            events[entity_key] = (entity_type, action, data)
+
+    def close_window(self, project_id: str):
+        with self.lock:
+            events = self.pending.pop(project_id, {})
+        if events:
+            self.flush(project_id, list(events.values()))
@@ -1,13 +1,16 @@
 import time
-from typing import TYPE_CHECKING
+import uuid
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable
 
 import ayon_api
 import gazu
-from nxtools import logging
+from nxtools import log_traceback, logging
 
 if TYPE_CHECKING:
     from .processor import KitsuProcessor
 
+from .cache import get_ayon_users
 from .utils import (
     get_asset_types,
     get_statuses,
@@ -16,12 +19,59 @@ from .utils import (
     preprocess_task,
 )
 
+# Ayon project data key holding the `updated_at` of the newest Kitsu entity
+#   synced to the project
+WATERMARK_KEY = "kitsuSyncWatermark"
+
+# entities updated this long before the watermark are synced again by
+#   a delta sync, covering changes made while the previous sync was running
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+# folder types of the Ayon folders synced from Kitsu entities
+KITSU_FOLDER_TYPES = (
+    "Episode",
+    "Sequence",
+    "Shot",
+    "Asset",
+    "Edit",
+    "Concept",
+)
+
+
+def filter_updated(
+    records: list[dict[str, str]],
+    updated_since: str | None = None,
+    kitsu_ids: set[str] | None = None,
+) -> list[dict[str, str]]:
+    """Keep the records updated in Kitsu since `updated_since`
+
+    The ids of all the records, updated or not, are added to `kitsu_ids`
+    so deletions can be detected without fetching the records again.
+    """
+    if kitsu_ids is not None:
+        kitsu_ids.update(record["id"] for record in records)
+    if updated_since is None:
+        return records
+    return [
+        record
+        for record in records
+        if (record.get("updated_at") or "") >= updated_since
+    ]
+
 
 def get_assets(
-    kitsu_project_id: str, asset_types: dict[str, str]
+    kitsu_project_id: str,
+    asset_types: dict[str, str],
+    updated_since: str | None = None,
+    kitsu_ids: set[str] | None = None,
 ) -> list[dict[str, str]]:
+    records = filter_updated(
+        gazu.asset.all_assets_for_project(kitsu_project_id),
+        updated_since,
+        kitsu_ids,
+    )
     assets: list[dict[str, str]] = []
-    for record in gazu.asset.all_assets_for_project(kitsu_project_id):
+    for record in records:
         assets.append(preprocess_asset(kitsu_project_id, record, asset_types))
     return assets
 
@@ -29,32 +79,226 @@ def get_assets(
 def get_tasks(
     kitsu_project_id: str,
     task_types: dict[str, str],
-    task_statuses: dict[str, str]
+    task_statuses: dict[str, str],
+    persons: list[dict[str, str]] | None = None,
+    ayon_users: dict[str, str] | None = None,
+    updated_since: str | None = None,
+    kitsu_ids: set[str] | None = None,
 ) -> list[dict[str, str]]:
+    records = filter_updated(
+        gazu.task.all_tasks_for_project(kitsu_project_id),
+        updated_since,
+        kitsu_ids,
+    )
+
+    # all tasks are matched against the same snapshot of ayon users
+    if ayon_users is None:
+        ayon_users = get_ayon_users()
+
+    # resolve the assignees from the already fetched persons
+    persons_by_id = {person["id"]: person for person in persons or []}
+    assignee_ids = {id for record in records for id in record["assignees"]}
+    if assignee_ids - persons_by_id.keys():
+        # persons missing from the list are fetched in a single request
+        persons_by_id.update(
+            {person["id"]: person for person in gazu.person.all_persons()}
+        )
+
     tasks: list[dict[str, str]] = []
-    for record in gazu.task.all_tasks_for_project(kitsu_project_id):
-        record["persons"]: list[dict[str, str]] = []
-        for id in record["assignees"]:
-            record["persons"].append({
-                "email": gazu.person.get_person(id)["email"]
-            })
+    for record in records:
+        record["persons"] = [
+            {"email": persons_by_id[id]["email"]}
+            for id in record["assignees"]
+            if id in persons_by_id
+        ]
         tasks.append(
             preprocess_task(
-                kitsu_project_id, record, task_types, task_statuses
+                kitsu_project_id,
+                record,
+                task_types,
+                task_statuses,
+                ayon_users,
             )
         )
     return tasks
 
 
+def get_concepts(kitsu_project_id: str) -> list[dict[str, str]]:
+    # Concepts were introduced at Kitsu/Zou v0.18.0.
+    # If the user runs an older version if Kitsu, gazu.concept will
+    #    throw an error. Any other error is raised, an empty list would
+    #    mark all synced concepts as deleted.
+    try:
+        return gazu.concept.all_concepts_for_project(kitsu_project_id)
+    except (AttributeError, gazu.exception.RouteNotFoundException):
+        return []
+
+
+def push_chunk(
+    parent: "KitsuProcessor",
+    project_name: str,
+    entities: list[dict[str, str]],
+    session_id: str,
+    close_session: bool = False,
+) -> bool:
+    """Push a chunk of entities as part of a full sync session"""
+    for entity in entities:
+        entity["ayon_server_url"] = ayon_api.get_base_url()
+
+    res = ayon_api.post(
+        f"{parent.entrypoint}/push",
+        project_name=project_name,
+        entities=entities,
+        session_id=session_id,
+        close_session=close_session,
+        aggregate_events=parent.sync_aggregate_events,
+    )
+    if res.status_code != 200:
+        logging.error(
+            f"Pushing {len(entities)} entities to {project_name}"
+            f" failed: {res.status_code} {res.data}"
+        )
+        return False
+    return True
+
+
+def get_synced_size(parent: "KitsuProcessor", project_name: str) -> int:
+    """Number of folders and tasks synced to the Ayon project"""
+    res = ayon_api.get(f"{parent.entrypoint}/synced-count/{project_name}")
+    if res.status_code != 200:
+        return 0
+    return res.data["folders"] + res.data["tasks"]
+
+
+def sort_pairs(
+    parent: "KitsuProcessor",
+    pairs: list[dict[str, str]],
+    order: str = "pairing",
+    priority: list[str] | None = None,
+) -> list[dict[str, str]]:
+    """Order paired projects for the startup sync
+
+    Projects listed in `priority` come first, in that order. The others
+    keep the pairing order or, for `largest_first`, are ordered by the
+    number of entities synced so far so the longest syncs start early.
+    """
+    if order == "largest_first":
+        sizes = {
+            pair["ayonProjectName"]: get_synced_size(
+                parent, pair["ayonProjectName"]
+            )
+            for pair in pairs
+        }
+        pairs = sorted(
+            pairs,
+            key=lambda pair: sizes[pair["ayonProjectName"]],
+            reverse=True,
+        )
+
+    priority = priority or []
+    return sorted(
+        pairs,
+        key=lambda pair: (
+            priority.index(pair["ayonProjectName"])
+            if pair["ayonProjectName"] in priority
+            else len(priority)
+        ),
+    )
+
+
+def get_watermark(project_name: str) -> str | None:
+    project = ayon_api.get_project(project_name)
+    if not project:
+        return None
+    return (project.get("data") or {}).get(WATERMARK_KEY)
+
+
+def set_watermark(project_name: str, watermark: str):
+    project = ayon_api.get_project(project_name)
+    data = project.get("data") or {}
+    data[WATERMARK_KEY] = watermark
+    ayon_api.update_project(project_name, data=data)
+
+
+def get_updated_since(watermark: str) -> str:
+    """Start of the delta sync window for the given watermark"""
+    updated_since = datetime.fromisoformat(watermark) - WATERMARK_OVERLAP
+    return updated_since.isoformat(timespec="seconds")
+
+
+def remove_deleted_entities(
+    parent: "KitsuProcessor",
+    project_name: str,
+    kitsu_ids: set[str],
+    unlisted_types: set[str] | None = None,
+):
+    """Remove synced Ayon entities whose Kitsu entity no longer exists
+
+    Entities of `unlisted_types`, whose Kitsu listing failed, are kept.
+    """
+    unlisted_types = unlisted_types or set()
+    res = ayon_api.get(f"{parent.entrypoint}/synced-ids/{project_name}")
+    if res.status_code != 200:
+        logging.error(f"Unable to get synced ids of {project_name}")
+        return
+
+    # children are removed before their parents
+    entities = []
+    if "Task" not in unlisted_types:
+        entities.extend(
+            {"id": kitsu_id, "type": "Task"}
+            for kitsu_id in res.data["tasks"]
+            if kitsu_id not in kitsu_ids
+        )
+    for folder_type in reversed(KITSU_FOLDER_TYPES):
+        if folder_type in unlisted_types:
+            continue
+        entities.extend(
+            {"id": kitsu_id, "type": folder_type}
+            for kitsu_id, synced_type in res.data["folders"].items()
+            if synced_type == folder_type and kitsu_id not in kitsu_ids
+        )
+    if not entities:
+        return
+
+    logging.info(
+        f"Removing {len(entities)} entities deleted in Kitsu"
+        f" from {project_name}"
+    )
+    for entity in entities:
+        entity["ayon_server_url"] = ayon_api.get_base_url()
+    ayon_api.post(
+        f"{parent.entrypoint}/remove",
+        project_name=project_name,
+        entities=entities,
+        aggregate_events=parent.sync_aggregate_events,
+        bulk=True,
+    )
+
+
 def project_full_sync(
-    parent: "KitsuProcessor", kitsu_project_id: str, project_name: str
+    parent: "KitsuProcessor",
+    kitsu_project_id: str,
+    project_name: str,
+    progress: Callable[[int], None] | None = None,
+    updated_since: str | None = None,
 ):
     """Sync all entities from a Kitsu project to an Ayon project.
 
+    Entities are loaded one type at a time, in the order their parents
+    have to exist in Ayon, and pushed in chunks of
+    `parent.sync_chunk_size` sharing one sync session.
+
+    When `updated_since` is set only the entities updated since then are
+    pushed and synced Ayon entities missing in Kitsu are removed.
+
     Args:
         parent (KitsuProcessor): The parent processor
         kitsu_project_id (str): The Kitsu project id
         project_name (str): The Ayon
+        progress (Callable[[int], None]): Called with the percentage
+            of the sync done after every pushed chunk
+        updated_since (str): Only push entities updated since this time
     """
     start_time = time.time()
     logging.info(f"Syncing kitsu project {kitsu_project_id} to {project_name}")
@@ -64,34 +308,143 @@ def project_full_sync(
     task_types = get_task_types(kitsu_project_id)
     persons = gazu.person.all_persons()
 
-    assets = get_assets(kitsu_project_id, asset_types)
-    tasks = get_tasks(kitsu_project_id, task_types, task_statuses)
+    # ids of all the project's kitsu entities, used to detect deletions
+    kitsu_ids: set[str] = set(asset_types)
 
-    episodes = gazu.shot.all_episodes_for_project(kitsu_project_id)
-    seqs = gazu.shot.all_sequences_for_project(kitsu_project_id)
-    shots = gazu.shot.all_shots_for_project(kitsu_project_id)
-    edits = gazu.edit.all_edits_for_project(kitsu_project_id)
-    # Concepts were introduced at Kitsu/Zou v0.18.0.
-    # If the user runs an older version if Kitsu, gazu.concept will
-    #    throw an error.
-    try:
-        concepts = gazu.concept.all_concepts_for_project(kitsu_project_id)
-    except Exception:
-        concepts = []
+    def updated(records: list[dict[str, str]]) -> list[dict[str, str]]:
+        return filter_updated(records, updated_since, kitsu_ids)
 
-    entities = (
-        persons + assets + episodes + seqs + shots + edits + concepts + tasks
-    )
+    # (label, kitsu type, loader) of every entity type
+    loaders: list[tuple[str, str, Callable[[], list[dict[str, str]]]]] = [
+        ("persons", "Person", lambda: filter_updated(persons, updated_since)),
+        (
+            "episodes",
+            "Episode",
+            lambda: updated(
+                gazu.shot.all_episodes_for_project(kitsu_project_id)
+            ),
+        ),
+        (
+            "sequences",
+            "Sequence",
+            lambda: updated(
+                gazu.shot.all_sequences_for_project(kitsu_project_id)
+            ),
+        ),
+        (
+            "shots",
+            "Shot",
+            lambda: updated(gazu.shot.all_shots_for_project(kitsu_project_id)),
+        ),
+        (
+            "assets",
+            "Asset",
+            lambda: get_assets(
+                kitsu_project_id, asset_types, updated_since, kitsu_ids
+            ),
+        ),
+        (
+            "edits",
+            "Edit",
+            lambda: updated(gazu.edit.all_edits_for_project(kitsu_project_id)),
+        ),
+        (
+            "concepts",
+            "Concept",
+            lambda: updated(get_concepts(kitsu_project_id)),
+        ),
+        (
+            "tasks",
+            "Task",
+            lambda: get_tasks(
+                kitsu_project_id,
+                task_types,
+                task_statuses,
+                persons,
+                parent.user_directory.get(),
+                updated_since,
+                kitsu_ids,
+            ),
+        ),
+    ]
 
-    for entity in entities:
-        entity["ayon_server_url"] = ayon_api.get_base_url()
+    session_id = uuid.uuid4().hex
+    chunk_size = parent.sync_chunk_size
+    failed_chunks = 0
+    watermark = ""
+    # a type whose listing failed is not synced, and the Ayon entities of
+    #   that type are not treated as deleted
+    unlisted_types: set[str] = set()
+    for index, (label, kitsu_type, loader) in enumerate(loaders):
+        try:
+            entities = loader()
+        except Exception:
+            log_traceback(f"Unable to list kitsu {label} of {project_name}")
+            unlisted_types.add(kitsu_type)
+            entities = []
+        watermark = max(
+            [watermark] + [e.get("updated_at") or "" for e in entities]
+        )
+        for start in range(0, len(entities), chunk_size):
+            chunk = entities[start : start + chunk_size]
+            if not push_chunk(parent, project_name, chunk, session_id):
+                failed_chunks += 1
+            logging.info(
+                f"Pushed {start + len(chunk)}/{len(entities)} {label}"
+                f" to {project_name}"
+            )
+            # every type is an equal share of the progress, which moves
+            #   within the share of the type after every chunk
+            if progress:
+                done = (start + len(chunk)) / len(entities)
+                progress(int(100 * (index + done) / len(loaders)))
+        if progress and not entities:
+            progress(int(100 * (index + 1) / len(loaders)))
+
+    push_chunk(parent, project_name, [], session_id, close_session=True)
+
+    if failed_chunks:
+        raise RuntimeError(
+            f"Full Sync for project {project_name} failed"
+            f" to push {failed_chunks} chunks"
+        )
+
+    if updated_since is not None:
+        remove_deleted_entities(
+            parent, project_name, kitsu_ids, unlisted_types
+        )
+
+    if unlisted_types:
+        raise RuntimeError(
+            f"Sync for project {project_name} failed to list"
+            f" {', '.join(sorted(unlisted_types))} entities"
+        )
+
+    # only move the watermark once everything up to it is in Ayon
+    if watermark:
+        set_watermark(project_name, watermark)
 
-    ayon_api.post(
-        f"{parent.entrypoint}/push",
-        project_name=project_name,
-        entities=entities,
-    )
     logging.info(
-        f"Full Sync for project {project_name}"
-        f" completed in {time.time() - start_time}s"
+        f"{'Delta' if updated_since else 'Full'} Sync for project"
+        f" {project_name} completed in {time.time() - start_time}s"
+    )
+
+
+def project_delta_sync(
+    parent: "KitsuProcessor",
+    kitsu_project_id: str,
+    project_name: str,
+    progress: Callable[[int], None] | None = None,
+):
+    """Sync the entities changed in Kitsu since the last sync
+
+    Falls back to a full sync for projects that were not synced yet.
+    """
+    watermark = get_watermark(project_name)
+    project_full_sync(
+        parent,
+        kitsu_project_id,
+        project_name,
+        progress=progress,
+        updated_since=get_updated_since(watermark) if watermark else None,
     )
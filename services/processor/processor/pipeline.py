@@ -0,0 +1,68 @@
+import queue
+import threading
+import zlib
+from typing import Callable
+
+from nxtools import log_traceback, logging
+
+
+class EventPipeline:
+    """Runs the Kitsu event handlers on a pool of worker threads
+
+    Every worker owns a bounded queue. Events are routed to a worker by
+    their key, so events sharing a key are handled one after another in
+    the order they arrived while events with different keys run in
+    parallel. When a queue is full, `submit` blocks until the worker
+    catches up.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 1000):
+        self.queues: list[queue.Queue[Callable[[], None]]] = [
+            queue.Queue(maxsize=queue_size) for _ in range(max(workers, 1))
+        ]
+        self.threads: list[threading.Thread] = []
+
+    def start(self):
+        for index, jobs in enumerate(self.queues):
+            thread = threading.Thread(
+                target=self.run_worker,
+                args=(jobs,),
+                name=f"kitsu-event-worker-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self.threads.append(thread)
+        logging.info(f"Started {len(self.threads)} event workers")
+
+    def get_queue(
+        self, key: str | None
+    ) -> "queue.Queue[Callable[[], None]]":
+        # a stable hash, so the same key always lands on the same worker
+        index = zlib.crc32((key or "").encode()) % len(self.queues)
+        return self.queues[index]
+
+    def submit(self, key: str | None, job: Callable[[], None]):
+        jobs = self.get_queue(key)
+        try:
+            jobs.put_nowait(job)
+        except queue.Full:
+            logging.warning(
+                f"Event queue is full ({jobs.maxsize} events),"
+                " waiting for the worker"
+            )
+            jobs.put(job)
+
+    def join(self):
+        """Wait until all the submitted events are handled"""
+        for jobs in self.queues:
+            jobs.join()
+
+    def run_worker(self, jobs: "queue.Queue[Callable[[], None]]"):
+        while True:
+            job = jobs.get()
+            try:
+                job()
+            except Exception:
+                log_traceback("Unable to handle Kitsu event")
+            finally:
+                jobs.task_done()
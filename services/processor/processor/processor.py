@@ -3,13 +3,21 @@ import socket
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Callable
 
 import ayon_api
 import gazu
 from nxtools import log_traceback, logging
 
-from .fullsync import project_full_sync
+from .cache import ProjectMetadata, UserDirectory
+from .coalescer import EventCoalescer, KitsuEvent
+from .fullsync import project_delta_sync, project_full_sync, sort_pairs
+from .pipeline import EventPipeline
+from .sharding import Shard
 from .update_from_kitsu import (
+    FETCHERS,
     create_or_update_asset,
     create_or_update_concept,
     create_or_update_edit,
@@ -27,6 +35,7 @@ from .update_from_kitsu import (
     delete_sequence,
     delete_shot,
     delete_task,
+    sync_events,
     update_project,
 )
 
@@ -35,6 +44,15 @@ if service_name := os.environ.get("AYON_SERVICE_NAME"):
 
 SENDER = f"kitsu-processor-{socket.gethostname()}"
 
+# seconds between polls for new sync jobs while there are none
+JOB_POLL_INTERVAL = 0.5
+
+# seconds a sync job slot waits after an error before polling again
+JOB_RETRY_INTERVAL = 5
+
+# seconds between polls for Ayon project events changing the pairings
+PAIRING_REFRESH_INTERVAL = 10
+
 
 class KitsuServerError(Exception):
     pass
@@ -70,10 +88,60 @@ class KitsuProcessor:
         self.settings = ayon_api.get_service_addon_settings()
         self.entrypoint = f"/addons/{self.addon_name}/{self.addon_version}"
 
+        service_settings = self.settings.get("service_settings", {})
+        self.sync_chunk_size = service_settings.get("sync_chunk_size", 500)
+        self.sync_aggregate_events = service_settings.get(
+            "sync_aggregate_events", False
+        )
+        self.startup_sync_workers = service_settings.get(
+            "startup_sync_workers", 4
+        )
+        self.startup_sync_order = service_settings.get(
+            "startup_sync_order", "pairing"
+        )
+        self.startup_sync_priority = service_settings.get(
+            "startup_sync_priority", []
+        )
+        self.sync_job_workers = service_settings.get("sync_job_workers", 2)
+
+        # Kitsu events are handled off the socket.io thread
+        self.event_pipeline = EventPipeline(
+            workers=service_settings.get("event_workers", 4),
+            queue_size=service_settings.get("event_queue_size", 1000),
+        )
+        # repeated events of an entity within this many seconds are merged
+        #   and the changes of a project pushed together
+        self.event_coalescer = None
+        coalesce_window = service_settings.get("event_coalesce_window", 0.5)
+        if coalesce_window > 0:
+            self.event_coalescer = EventCoalescer(
+                coalesce_window, self.sync_coalesced_events
+            )
+
+        # replicas of the service split the paired projects among them
+        self.shard = Shard.from_env()
+        logging.info(f"KitsuProcessor running as {self.shard}")
+
         #
         # Get list of projects that have been paired
         #
-        self.pairing_list = self.get_pairing_list()
+        # kitsuProjectId -> ayonProjectName, kept up to date with the
+        #   Ayon project events
+        self.pairings: dict[str, str] = {
+            pair["kitsuProjectId"]: pair["ayonProjectName"]
+            for pair in self.get_pairing_list()
+            if pair.get("kitsuProjectId") and pair.get("ayonProjectName")
+        }
+
+        # a project is synced by one job slot or startup sync at a time
+        self.sync_locks: dict[str, threading.Lock] = {}
+        self.sync_locks_lock = threading.Lock()
+
+        # Ayon users matched with the assignees of Kitsu tasks
+        self.user_directory = UserDirectory()
+
+        # Kitsu asset types, task types and statuses of realtime events
+        self.project_metadata = ProjectMetadata()
 
         #
         # Get Kitsu server credentials from settings
@@ -135,146 +203,106 @@ class KitsuProcessor:
         self.event_client = gazu.events.init()
 
         # ============= Add Kitsu Event Listeners ==============
+        self.event_pipeline.start()
         gazu_listener_thread = threading.Thread(target=self.run_gazu_listeners)
         gazu_listener_thread.start()
 
     def run_gazu_listeners(self):
-        gazu.events.add_listener(
-            self.event_client,
-            "project:update",
-            lambda data: update_project(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "project:delete",
-            lambda data: delete_project(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "asset:new",
-            lambda data: create_or_update_asset(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "asset:update",
-            lambda data: create_or_update_asset(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "asset:delete",
-            lambda data: delete_asset(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "episode:new",
-            lambda data: create_or_update_episode(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "episode:update",
-            lambda data: create_or_update_episode(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "episode:delete",
-            lambda data: delete_episode(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "sequence:new",
-            lambda data: create_or_update_sequence(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "sequence:update",
-            lambda data: create_or_update_sequence(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "sequence:delete",
-            lambda data: delete_sequence(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "shot:new",
-            lambda data: create_or_update_shot(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "shot:update",
-            lambda data: create_or_update_shot(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "shot:delete",
-            lambda data: delete_shot(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "task:new",
-            lambda data: create_or_update_task(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "task:update",
-            lambda data: create_or_update_task(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "task:delete",
-            lambda data: delete_task(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "edit:new",
-            lambda data: create_or_update_edit(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "edit:update",
-            lambda data: create_or_update_edit(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "edit:delete",
-            lambda data: delete_edit(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "person:new",
-            lambda data: create_or_update_person(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "person:update",
-            lambda data: create_or_update_person(self, data),
-        )
-        gazu.events.add_listener(
-            self.event_client,
-            "person:delete",
-            lambda data: delete_person(self, data),
-        )
+        self.add_listener("project:update", update_project)
+        self.add_listener("project:delete", delete_project)
+        self.add_listener("asset:new", create_or_update_asset)
+        self.add_listener("asset:update", create_or_update_asset)
+        self.add_listener("asset:delete", delete_asset)
+        self.add_listener("episode:new", create_or_update_episode)
+        self.add_listener("episode:update", create_or_update_episode)
+        self.add_listener("episode:delete", delete_episode)
+        self.add_listener("sequence:new", create_or_update_sequence)
+        self.add_listener("sequence:update", create_or_update_sequence)
+        self.add_listener("sequence:delete", delete_sequence)
+        self.add_listener("shot:new", create_or_update_shot)
+        self.add_listener("shot:update", create_or_update_shot)
+        self.add_listener("shot:delete", delete_shot)
+        self.add_listener("task:new", create_or_update_task)
+        self.add_listener("task:update", create_or_update_task)
+        self.add_listener("task:delete", delete_task)
+        self.add_listener("edit:new", create_or_update_edit)
+        self.add_listener("edit:update", create_or_update_edit)
+        self.add_listener("edit:delete", delete_edit)
+        self.add_listener("person:new", create_or_update_person)
+        self.add_listener("person:update", create_or_update_person)
+        self.add_listener("person:delete", delete_person)
         # Concept events were fixed in Zou 0.19.0, so listen only if
         # the user is running Zou euqual or above 0.19.0
         if tuple(gazu.client.get_api_version().split(".")) >= ("0", "19", "0"):
-            gazu.events.add_listener(
-                self.event_client,
-                "concept:new",
-                lambda data: create_or_update_concept(self, data),
-            )
-            gazu.events.add_listener(
-                self.event_client,
-                "concept:update",
-                lambda data: create_or_update_concept(self, data),
-            )
-            gazu.events.add_listener(
-                self.event_client,
-                "concept:delete",
-                lambda data: delete_concept(self, data),
-            )
+            self.add_listener("concept:new", create_or_update_concept)
+            self.add_listener("concept:update", create_or_update_concept)
+            self.add_listener("concept:delete", delete_concept)
+
+        # changed metadata only drops the cached lookup tables
+        for kitsu_type, invalidate in (
+            ("asset-type", self.project_metadata.invalidate_asset_types),
+            ("task-type", self.project_metadata.invalidate_task_types),
+            ("task-status", self.project_metadata.invalidate_statuses),
+        ):
+            for action in ("new", "update", "delete"):
+                gazu.events.add_listener(
+                    self.event_client,
+                    f"{kitsu_type}:{action}",
+                    lambda data, invalidate=invalidate: invalidate(),
+                )
         logging.info("Gazu event listeners added")
         gazu.events.run_client(self.event_client)
 
+    def add_listener(
+        self,
+        event_name: str,
+        handler: Callable[["KitsuProcessor", dict[str, str]], None],
+    ):
+        """Listen to a Kitsu event, handling it in the event pipeline
+
+        Events are keyed by their project, so all changes of a project,
+        creations of parents before their children included, are applied
+        in order while different projects are handled in parallel.
+        A burst of events of a single project is therefore handled by one
+        worker, whatever the number of event workers.
+        Persons are not part of a project and are keyed by their id.
+
+        Events of project entities are coalesced first, when enabled.
+        Events of unpaired projects and of projects owned by other
+        replicas are ignored before anything is fetched from Kitsu.
+        """
+        entity_type, action = event_name.split(":")
+
+        def on_event(data: dict[str, str]):
+            # persons are not part of a project
+            project_id = None
+            if entity_type != "person":
+                project_id = data.get("project_id")
+            if not self.shard.owns(project_id):
+                return  # handled by another replica
+            if project_id and project_id not in self.pairings:
+                return  # the project is not paired
+
+            if self.event_coalescer and entity_type in FETCHERS:
+                self.event_coalescer.add(
+                    data["project_id"], entity_type, action, data
+                )
+                return
+            # all events of a project share one key, so the events of an
+            #   entity and of its parents can never overtake each other
+            key = project_id or data.get(f"{entity_type}_id")
+            self.event_pipeline.submit(key, lambda: handler(self, data))
+
+        gazu.events.add_listener(self.event_client, event_name, on_event)
+
+    def sync_coalesced_events(
+        self, kitsu_project_id: str, events: list[KitsuEvent]
+    ):
+        self.event_pipeline.submit(
+            kitsu_project_id,
+            lambda: sync_events(self, kitsu_project_id, events),
+        )
+
     def get_pairing_list(self):
         """maintain a list of pairings so that we can check
         the kitsu change is in a paired project and get the ayon project name
@@ -288,96 +316,260 @@ class KitsuProcessor:
 
     def get_paired_ayon_project(self, kitsu_project_id: str) -> str | None:
         """returns the ayon project if paired else None"""
-        for pair in self.pairing_list:
-            if pair["kitsuProjectId"] == kitsu_project_id:
-                return pair["ayonProjectName"]
+        return self.pairings.get(kitsu_project_id)
 
     def set_paired_ayon_project(
         self, kitsu_project_id: str, ayon_project_name: str
     ):
         """add a new pair to the list"""
-        for pair in self.pairing_list:
-            if "kitsuProjectId" in pair:
-                return
-        self.pairing_list.append(
-            {
-                "kitsuProjectId": kitsu_project_id,
-                "ayonProjectName": ayon_project_name
-            }
+        self.pairings[kitsu_project_id] = ayon_project_name
+
+    def run_pairing_refresh(self):
+        """Keep the pairings up to date with the Ayon project events
+
+        Projects paired, unpaired or deleted while the service runs, also
+        by other replicas, start or stop receiving realtime updates.
+        """
+        newer_than = datetime.now(timezone.utc).isoformat()
+        while True:
+            time.sleep(PAIRING_REFRESH_INTERVAL)
+            try:
+                newer_than = self.refresh_pairings(newer_than)
+            except Exception:
+                log_traceback("Unable to refresh the pairings")
+
+    def refresh_pairings(self, newer_than: str) -> str:
+        """Update the pairings of the projects changed since `newer_than`
+
+        Returns the creation time of the last handled event.
+        """
+        project_names: set[str] = set()
+        for event in ayon_api.get_events(
+            topics=["entity.project.*"],
+            newer_than=newer_than,
+            fields={"topic", "project", "createdAt"},
+        ):
+            newer_than = max(newer_than, event["createdAt"])
+            if event["project"]:
+                project_names.add(event["project"])
+
+        for project_name in project_names:
+            project = ayon_api.get_project(project_name)
+            kitsu_project_id = None
+            if project:
+                kitsu_project_id = project["data"].get("kitsuProjectId")
+
+            unpaired_ids = [
+                paired_id
+                for paired_id, paired_name in list(self.pairings.items())
+                if paired_name == project_name
+                and paired_id != kitsu_project_id
+            ]
+            for paired_id in unpaired_ids:
+                logging.info(f"Project {project_name} was unpaired")
+                self.pairings.pop(paired_id, None)
+            if kitsu_project_id and kitsu_project_id not in self.pairings:
+                logging.info(f"Project {project_name} was paired")
+                self.pairings[kitsu_project_id] = project_name
+        return newer_than
+
+    def get_sync_lock(self, project_name: str) -> threading.Lock:
+        """Lock held while the Ayon project is fully or delta synced"""
+        with self.sync_locks_lock:
+            if project_name not in self.sync_locks:
+                self.sync_locks[project_name] = threading.Lock()
+            return self.sync_locks[project_name]
+
+    def sync_project(
+        self,
+        sync: Callable[..., None],
+        kitsu_project_id: str,
+        project_name: str,
+        **kwargs,
+    ):
+        """Run a full or delta sync, waiting for other syncs of the project
+
+        Two syncs of one project would race to create the same folders.
+        """
+        with self.get_sync_lock(project_name):
+            sync(self, kitsu_project_id, project_name, **kwargs)
+
+    def run_startup_sync(self):
+        """Sync the changes made in all paired projects since their last
+        sync, `startup_sync_workers` projects at a time
+
+        Only the projects owned by this replica are synced.
+        """
+        pairs = sort_pairs(
+            self,
+            [
+                {
+                    "kitsuProjectId": kitsu_project_id,
+                    "ayonProjectName": ayon_project_name,
+                }
+                for kitsu_project_id, ayon_project_name in list(
+                    self.pairings.items()
+                )
+                if self.shard.owns(kitsu_project_id)
+            ],
+            self.startup_sync_order,
+            self.startup_sync_priority,
         )
+        logging.info(f"Running sync for {len(pairs)} paired projects")
+        with ThreadPoolExecutor(
+            max_workers=self.startup_sync_workers,
+            thread_name_prefix="kitsu-startup-sync",
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self.sync_project,
+                    project_delta_sync,
+                    pair["kitsuProjectId"],
+                    pair["ayonProjectName"],
+                ): pair["ayonProjectName"]
+                for pair in pairs
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception:
+                    log_traceback(
+                        f"Unable to sync kitsu project {futures[future]}"
+                    )
+        logging.info("Sync of all paired projects finished")
 
     def start_processing(self):
         logging.info("KitsuProcessor started")
-        startup = True
 
-        while True:
-            # Sync all paired projects
-            if startup:
-                logging.info("Running sync for all paired projects")
-                for pair in self.pairing_list:
-                    project_id = pair.get("kitsuProjectId")
-                    project_name = pair.get("ayonProjectName")
-                    if project_id and project_name:
-                        project_full_sync(
-                            self,
-                            project_id,
-                            project_name,
-                        )
-                startup = False
-
-            # Check for a new sync job
-            job = ayon_api.enroll_event_job(
-                source_topic="kitsu.sync_request",
-                target_topic="kitsu.sync",
-                sender=SENDER,
-                description="Syncing Kitsu to Ayon",
-                max_retries=3,
+        # sync jobs are enrolled while the paired projects are synced
+        startup_sync_thread = threading.Thread(
+            target=self.run_startup_sync, daemon=True
+        )
+        startup_sync_thread.start()
+
+        pairing_refresh_thread = threading.Thread(
+            target=self.run_pairing_refresh, daemon=True
+        )
+        pairing_refresh_thread.start()
+
+        job_threads = [
+            threading.Thread(
+                target=self.run_job_slot,
+                args=(slot,),
+                name=f"kitsu-sync-job-{slot}",
             )
+            for slot in range(self.sync_job_workers)
+        ]
+        for job_thread in job_threads:
+            job_thread.start()
+        for job_thread in job_threads:
+            job_thread.join()
+
+        logging.info("KitsuProcessor finished processing")
+        gazu.log_out()
+
+    def run_job_slot(self, slot: int):
+        """Enroll and run `kitsu.sync` jobs one at a time
 
-            if not job:
-                time.sleep(5)
-                continue
+        Every slot enrolls as its own sender, Ayon hands a job that is
+        already in progress back to the sender that enrolled it. Idle
+        slots poll every JOB_POLL_INTERVAL seconds, so a new job starts
+        within a second. A slot that handed a job off to another replica
+        waits as well, so the owning replica can enroll it.
+        """
+        sender = f"{SENDER}-{slot}"
+        while True:
+            try:
+                # Check for a new sync job
+                job = ayon_api.enroll_event_job(
+                    source_topic="kitsu.sync_request",
+                    target_topic="kitsu.sync",
+                    sender=sender,
+                    description="Syncing Kitsu to Ayon",
+                    max_retries=3,
+                )
 
-            src_job = ayon_api.get_event(job["dependsOn"])
+                if not job:
+                    time.sleep(JOB_POLL_INTERVAL)
+                    continue
 
-            kitsu_project_id = src_job["summary"]["kitsuProjectId"]
-            ayon_project_name = src_job["project"]
+                if not self.process_job(job, sender):
+                    time.sleep(JOB_POLL_INTERVAL)
+            except Exception:
+                # keep the slot alive when Ayon can not be reached
+                log_traceback(f"Sync job slot {slot} failed")
+                time.sleep(JOB_RETRY_INTERVAL)
+
+    def process_job(self, job: dict, sender: str) -> bool:
+        """Run an enrolled `kitsu.sync` job
 
+        A project is only synced by the replica owning it, as its delta
+        sync and events would race with the full sync. Jobs of other
+        replicas are restarted, so the owner enrolls them, and False is
+        returned.
+        """
+        src_job = ayon_api.get_event(job["dependsOn"])
+
+        kitsu_project_id = src_job["summary"]["kitsuProjectId"]
+        ayon_project_name = src_job["project"]
+
+        if not self.shard.owns(kitsu_project_id):
+            replica = self.shard.get_replica(kitsu_project_id) + 1
             ayon_api.update_event(
                 job["id"],
-                sender=SENDER,
-                status="in_progress",
+                sender=sender,
+                status="restarted",
                 project_name=ayon_project_name,
-                description="Syncing Kitsu project...",
+                description=f"Waiting for Kitsu processor replica {replica}",
             )
+            return False
+
+        ayon_api.update_event(
+            job["id"],
+            sender=sender,
+            status="in_progress",
+            project_name=ayon_project_name,
+            description="Syncing Kitsu project...",
+        )
 
-            try:
-                project_full_sync(self, kitsu_project_id, ayon_project_name)
+        def report_progress(progress: int):
+            ayon_api.update_event(
+                job["id"],
+                sender=sender,
+                project_name=ayon_project_name,
+                progress=progress,
+            )
 
-                # if successful add the pair to the list
-                self.set_paired_ayon_project(
-                    kitsu_project_id, ayon_project_name
-                )
-            except Exception:
-                log_traceback(
-                    f"Unable to sync kitsu project {ayon_project_name}"
-                )
+        try:
+            self.sync_project(
+                project_full_sync,
+                kitsu_project_id,
+                ayon_project_name,
+                progress=report_progress,
+            )
 
-                ayon_api.update_event(
-                    job["id"],
-                    sender=SENDER,
-                    status="failed",
-                    project_name=ayon_project_name,
-                    description="Sync failed",
-                )
-            else:
-                ayon_api.update_event(
-                    job["id"],
-                    sender=SENDER,
-                    status="finished",
-                    project_name=ayon_project_name,
-                    description="Kitsu sync finished",
-                )
+            # if successful add the pair to the list
+            self.set_paired_ayon_project(
+                kitsu_project_id, ayon_project_name
+            )
+        except Exception:
+            log_traceback(
+                f"Unable to sync kitsu project {ayon_project_name}"
+            )
 
-        logging.info("KitsuProcessor finished processing")
-        gazu.log_out()
+            ayon_api.update_event(
+                job["id"],
+                sender=sender,
+                status="failed",
+                project_name=ayon_project_name,
+                description="Sync failed",
+            )
+        else:
+            ayon_api.update_event(
+                job["id"],
+                sender=sender,
+                status="finished",
+                project_name=ayon_project_name,
+                description="Kitsu sync finished",
+            )
+        return True
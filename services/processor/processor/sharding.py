@@ -0,0 +1,38 @@
+import os
+import zlib
+
+
+class Shard:
+    """The part of the paired projects handled by one processor replica
+
+    Projects are assigned to replicas by a stable hash of their Kitsu
+    project id, so every replica can tell which projects are its own
+    without talking to the others. Events without a project (persons)
+    belong to the first replica.
+    """
+
+    def __init__(self, index: int = 0, count: int = 1):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(
+                f"Invalid replica {index} of {count} processor replicas"
+            )
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def from_env(cls) -> "Shard":
+        return cls(
+            index=int(os.environ.get("KITSU_PROCESSOR_REPLICA", 0)),
+            count=int(os.environ.get("KITSU_PROCESSOR_REPLICAS", 1)),
+        )
+
+    def __str__(self) -> str:
+        return f"replica {self.index + 1}/{self.count}"
+
+    def get_replica(self, kitsu_project_id: str | None) -> int:
+        if not kitsu_project_id:
+            return 0
+        return zlib.crc32(kitsu_project_id.encode()) % self.count
+
+    def owns(self, kitsu_project_id: str | None) -> bool:
+        return self.get_replica(kitsu_project_id) == self.index
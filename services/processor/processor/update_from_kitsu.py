@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 
 import ayon_api
 import gazu
@@ -10,6 +10,78 @@ if TYPE_CHECKING:
     from .processor import KitsuProcessor
 
 
+def fetch_asset(
+    parent: "KitsuProcessor", data: dict[str, str]
+) -> dict[str, str]:
+    entity = gazu.asset.get_asset(data["asset_id"])
+    return utils.preprocess_asset(
+        entity["project_id"],
+        entity,
+        parent.project_metadata.get_asset_types(
+            entity["project_id"], entity.get("entity_type_id")
+        ),
+    )
+
+
+def fetch_episode(
+    parent: "KitsuProcessor", data: dict[str, str]
+) -> dict[str, str]:
+    return gazu.shot.get_episode(data["episode_id"])
+
+
+def fetch_sequence(
+    parent: "KitsuProcessor", data: dict[str, str]
+) -> dict[str, str]:
+    return gazu.shot.get_sequence(data["sequence_id"])
+
+
+def fetch_shot(
+    parent: "KitsuProcessor", data: dict[str, str]
+) -> dict[str, str]:
+    return gazu.shot.get_shot(data["shot_id"])
+
+
+def fetch_task(
+    parent: "KitsuProcessor", data: dict[str, str]
+) -> dict[str, str]:
+    entity = gazu.task.get_task(data["task_id"])
+    return utils.preprocess_task(
+        entity["project_id"],
+        entity,
+        parent.project_metadata.get_task_types(
+            entity["project_id"], entity.get("task_type_id")
+        ),
+        parent.project_metadata.get_statuses(entity.get("task_status_id")),
+        ayon_users=parent.user_directory.get(),
+    )
+
+
+def fetch_edit(
+    parent: "KitsuProcessor", data: dict[str, str]
+) -> dict[str, str]:
+    return gazu.edit.get_edit(data["edit_id"])
+
+
+def fetch_concept(
+    parent: "KitsuProcessor", data: dict[str, str]
+) -> dict[str, str]:
+    return gazu.concept.get_concept(data["concept_id"])
+
+
+# fetch the current state of a Kitsu entity by its event data
+FETCHERS: dict[
+    str, Callable[["KitsuProcessor", dict[str, str]], dict[str, str]]
+] = {
+    "asset": fetch_asset,
+    "episode": fetch_episode,
+    "sequence": fetch_sequence,
+    "shot": fetch_shot,
+    "task": fetch_task,
+    "edit": fetch_edit,
+    "concept": fetch_concept,
+}
+
+
 def update_project(parent: "KitsuProcessor", data: dict[str, str]):
     logging.info(f"update_project: {data}")
     project_name = parent.get_paired_ayon_project(data["project_id"])
@@ -52,9 +124,7 @@ def create_or_update_asset(parent: "KitsuProcessor", data: dict[str, str]):
     if not project_name:
         return  # do nothing as this kitsu and ayon project are not paired
 
-    # Get asset entity
-    entity = gazu.asset.get_asset(data["asset_id"])
-    entity = utils.preprocess_asset(entity["project_id"], entity)
+    entity = fetch_asset(parent, data)
 
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
@@ -89,8 +159,7 @@ def create_or_update_episode(parent: "KitsuProcessor", data: dict[str, str]):
     project_name = parent.get_paired_ayon_project(data["project_id"])
     if not project_name:
         return  # do nothing as this kitsu and ayon project are not paired
-    # Get episode entity
-    entity = gazu.shot.get_episode(data["episode_id"])
+    entity = fetch_episode(parent, data)
 
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
@@ -126,7 +195,7 @@ def create_or_update_sequence(parent: "KitsuProcessor", data: dict[str, str]):
     if not project_name:
         return  # do nothing as this kitsu and ayon project are not paired
 
-    entity = gazu.shot.get_sequence(data["sequence_id"])
+    entity = fetch_sequence(parent, data)
 
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
@@ -162,7 +231,7 @@ def create_or_update_shot(parent: "KitsuProcessor", data: dict[str, str]):
     if not project_name:
         return  # do nothing as this kitsu and ayon project are not paired
 
-    entity = gazu.shot.get_shot(data["shot_id"])
+    entity = fetch_shot(parent, data)
 
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
@@ -198,8 +267,7 @@ def create_or_update_task(parent: "KitsuProcessor", data: dict[str, str]):
     if not project_name:
         return  # do nothing as this kitsu and ayon project are not paired
 
-    entity = gazu.task.get_task(data["task_id"])
-    entity = utils.preprocess_task(entity["project_id"], entity)
+    entity = fetch_task(parent, data)
 
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
@@ -235,8 +303,7 @@ def create_or_update_edit(parent: "KitsuProcessor", data: dict[str, str]):
     if not project_name:
         return  # do nothing as this kitsu and ayon project are not paired
 
-    # Get edit entity
-    entity = gazu.edit.get_edit(data["edit_id"])
+    entity = fetch_edit(parent, data)
 
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
@@ -272,8 +339,7 @@ def create_or_update_concept(parent: "KitsuProcessor", data: dict[str, str]):
     if not project_name:
         return  # do nothing as this kitsu and ayon project are not paired
 
-    # Get concept entity
-    entity = gazu.concept.get_concept(data["concept_id"])
+    entity = fetch_concept(parent, data)
 
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
@@ -310,11 +376,14 @@ def create_or_update_person(parent: "KitsuProcessor", data: dict[str, str]):
     # Add ayon base url so we can use it in REST calls later on
     entity["ayon_server_url"] = ayon_api.get_base_url()
 
-    return ayon_api.post(
+    res = ayon_api.post(
         f"{parent.entrypoint}/push",
         project_name="",
         entities=[entity],
     )
+    # the ayon user might have been created or renamed
+    parent.user_directory.invalidate()
+    return res
 
 
 def delete_person(parent: "KitsuProcessor", data: dict[str, str]):
@@ -328,8 +397,66 @@ def delete_person(parent: "KitsuProcessor", data: dict[str, str]):
         "type": "person",
         "ayon_server_url": ayon_api.get_base_url(),
     }
-    return ayon_api.post(
+    res = ayon_api.post(
         f"{parent.entrypoint}/remove",
         project_name=project_name,
         entities=[entity],
     )
+    parent.user_directory.invalidate()
+    return res
+
+
+def sync_events(
+    parent: "KitsuProcessor",
+    kitsu_project_id: str,
+    events: list[tuple[str, str, dict[str, str]]],
+):
+    """Apply coalesced Kitsu events of one project to Ayon
+
+    Every entity occurs once, with the last action received for it.
+    Created and updated entities are fetched and pushed in a single
+    request, deleted ones are removed in another.
+    """
+    project_name = parent.get_paired_ayon_project(kitsu_project_id)
+    if not project_name:
+        return  # do nothing as this kitsu and ayon project are not paired
+
+    entities = []
+    removed = []
+    for entity_type, action, data in events:
+        if action == "delete":
+            removed.append(
+                {
+                    "id": data[f"{entity_type}_id"],
+                    "type": entity_type.capitalize(),
+                    "ayon_server_url": ayon_api.get_base_url(),
+                }
+            )
+            continue
+
+        try:
+            entity = FETCHERS[entity_type](parent, data)
+        except gazu.exception.RouteNotFoundException:
+            # deleted in kitsu already, its delete event follows
+            logging.warning(f"Kitsu {entity_type} {data} not found")
+            continue
+        entity["ayon_server_url"] = ayon_api.get_base_url()
+        entities.append(entity)
+
+    logging.info(
+        f"Syncing {len(entities)} changed and {len(removed)} deleted"
+        f" entities to {project_name}"
+    )
+    if entities:
+        ayon_api.post(
+            f"{parent.entrypoint}/push",
+            project_name=project_name,
+            entities=entities,
+        )
+    if removed:
+        ayon_api.post(
+            f"{parent.entrypoint}/remove",
+            project_name=project_name,
+            entities=removed,
+            bulk=True,
+        )
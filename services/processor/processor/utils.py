@@ -1,31 +1,11 @@
 """ utils shared between fullsync.py and update_from_kitsu.py """
 
-import ayon_api
-import gazu
-
-
-def get_asset_types(kitsu_project_id: str) -> dict[str, str]:
-    raw_asset_types = gazu.asset.all_asset_types_for_project(kitsu_project_id)
-    kitsu_asset_types = {}
-    for asset_type in raw_asset_types:
-        kitsu_asset_types[asset_type["id"]] = asset_type["name"]
-    return kitsu_asset_types
-
-
-def get_task_types(kitsu_project_id: str) -> dict[str, str]:
-    raw_task_types = gazu.task.all_task_types_for_project(kitsu_project_id)
-    kitsu_task_types = {}
-    for task_type in raw_task_types:
-        kitsu_task_types[task_type["id"]] = task_type["name"]
-    return kitsu_task_types
-
-
-def get_statuses() -> dict[str, str]:
-    raw_statuses = gazu.task.all_task_statuses()
-    kitsu_statuses = {}
-    for status in raw_statuses:
-        kitsu_statuses[status["id"]] = status["name"]
-    return kitsu_statuses
+from .cache import (
+    get_asset_types,
+    get_ayon_users,
+    get_statuses,
+    get_task_types,
+)
 
 
 def preprocess_asset(
@@ -46,6 +26,7 @@ def preprocess_task(
     task: dict[str, str | list[str]],
     task_types: dict[str, str | list[str]] = {},
     statuses: dict[str, str] = {},
+    ayon_users: dict[str, str] | None = None,
 ) -> dict[str, str | list[str]]:
     if not task_types:
         task_types = get_task_types(kitsu_project_id)
@@ -63,13 +44,14 @@ def preprocess_task(
         task["name"] = task["task_type_name"].lower()
 
     # Match the assigned ayon user with the assigned kitsu email
-    ayon_users = {
-        user["attrib"]["email"]: user["name"] for user in ayon_api.get_users()
-    }
-    task_emails = {user["email"] for user in task["persons"]}
-    task["assignees"] = []
-    task["assignees"].extend(
-        ayon_users[email] for email in task_emails if email in ayon_users
+    if ayon_users is None:
+        ayon_users = get_ayon_users()
+    # the Kitsu order is kept, the assignees are part of the kitsuHash
+    task_emails = [user["email"] for user in task["persons"]]
+    task["assignees"] = list(
+        dict.fromkeys(
+            ayon_users[email] for email in task_emails if email in ayon_users
+        )
     )
 
     return task
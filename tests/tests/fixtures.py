@@ -5,6 +5,7 @@ import ayon_api as _ayon_api
 import gazu as _gazu
 import pytest
 from dotenv import load_dotenv
+from processor.cache import ProjectMetadata, UserDirectory
 
 from . import mock_data
 
@@ -147,6 +148,10 @@ def gazu():
 def processor(kitsu_url):
     class MockProcessor:
         entrypoint = kitsu_url
+        user_directory = UserDirectory()
+        project_metadata = ProjectMetadata()
+        sync_chunk_size = 500
+        sync_aggregate_events = False
 
         def get_paired_ayon_project(self, kitsu_project_id):
             return PROJECT_NAME
@@ -0,0 +1,58 @@
+import ayon_api
+from processor.cache import ProjectMetadata, UserDirectory
+
+from . import mock_data
+from .fixtures import PROJECT_ID, gazu
+
+""" tests for services/processor/cache.py
+
+    $ poetry run pytest tests/test_cache.py
+"""
+
+
+def test_user_directory(monkeypatch):
+    calls = []
+
+    def get_users():
+        calls.append(1)
+        return [{"name": "user1", "attrib": {"email": "user1@temp.com"}}]
+
+    monkeypatch.setattr(ayon_api, "get_users", get_users)
+
+    directory = UserDirectory(ttl=300)
+    assert directory.get() == {"user1@temp.com": "user1"}
+    assert directory.get() == {"user1@temp.com": "user1"}
+    assert len(calls) == 1, "users are fetched once within the ttl"
+
+    directory.invalidate()
+    directory.get()
+    assert len(calls) == 2, "invalidate drops the cached users"
+
+    directory.ttl = 0
+    directory.get()
+    assert len(calls) == 3, "users are fetched again after the ttl"
+
+
+def test_project_metadata(gazu, monkeypatch):
+    calls = []
+
+    def all_asset_types_for_project(project_id):
+        calls.append(project_id)
+        return mock_data.all_asset_types_for_project
+
+    monkeypatch.setattr(
+        gazu.asset, "all_asset_types_for_project", all_asset_types_for_project
+    )
+
+    metadata = ProjectMetadata()
+    asset_types = metadata.get_asset_types(PROJECT_ID)
+    assert asset_types["asset-type-id-1"] == "Character"
+    metadata.get_asset_types(PROJECT_ID, "asset-type-id-2")
+    assert len(calls) == 1, "asset types are fetched once per project"
+
+    metadata.get_asset_types(PROJECT_ID, "asset-type-id-4")
+    assert len(calls) == 2, "an unknown asset type fetches them again"
+
+    metadata.invalidate_asset_types()
+    metadata.get_asset_types(PROJECT_ID)
+    assert len(calls) == 3, "invalidate drops the cached asset types"
@@ -0,0 +1,78 @@
+import threading
+
+import ayon_api
+
+from processor import update_from_kitsu
+from processor.coalescer import EventCoalescer
+
+from .fixtures import gazu
+
+
+def test_coalescer_merges_events_per_entity():
+    flushed = []
+    done = threading.Event()
+
+    def flush(project_id, events):
+        flushed.append((project_id, events))
+        done.set()
+
+    coalescer = EventCoalescer(0.1, flush)
+    for i in range(5):
+        coalescer.add(
+            "project-id-1", "task", "update",
+            {"project_id": "project-id-1", "task_id": "task-id-1", "i": i},
+        )
+    coalescer.add(
+        "project-id-1", "shot", "new",
+        {"project_id": "project-id-1", "shot_id": "shot-id-1"},
+    )
+    coalescer.add(
+        "project-id-1", "shot", "delete",
+        {"project_id": "project-id-1", "shot_id": "shot-id-1"},
+    )
+    assert done.wait(5)
+
+    assert len(flushed) == 1
+    project_id, events = flushed[0]
+    assert project_id == "project-id-1"
+    assert [(e[0], e[1]) for e in events] == [
+        ("task", "update"),
+        ("shot", "delete"),
+    ]
+    # the last event data wins
+    assert events[0][2]["i"] == 4
+
+
+def test_sync_events(gazu, monkeypatch, mocker):
+    class Parent:
+        entrypoint = "/addons/kitsu/9.9.9"
+
+        def get_paired_ayon_project(self, kitsu_project_id):
+            return "AYON_Project"
+
+    monkeypatch.setattr(
+        gazu.shot, "get_shot", lambda x: {"id": x, "type": "Shot"}
+    )
+    mocker.patch.object(ayon_api, "get_base_url", return_value="ayon")
+    post = mocker.patch.object(ayon_api, "post")
+
+    update_from_kitsu.sync_events(
+        Parent(),
+        "project-id-1",
+        [
+            ("shot", "update", {"shot_id": "shot-id-1"}),
+            ("shot", "new", {"shot_id": "shot-id-2"}),
+            ("task", "delete", {"task_id": "task-id-1"}),
+        ],
+    )
+
+    push, remove = post.call_args_list
+    assert push.args[0] == "/addons/kitsu/9.9.9/push"
+    assert [e["id"] for e in push.kwargs["entities"]] == [
+        "shot-id-1",
+        "shot-id-2",
+    ]
+    assert remove.args[0] == "/addons/kitsu/9.9.9/remove"
+    assert remove.kwargs["entities"] == [
+        {"id": "task-id-1", "type": "Task", "ayon_server_url": "ayon"}
+    ]
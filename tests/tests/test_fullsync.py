@@ -1,6 +1,7 @@
 from pprint import pprint
 
 import ayon_api
+import pytest
 from nxtools import logging
 from processor import fullsync
 
@@ -86,13 +87,14 @@ def test_get_tasks(gazu, monkeypatch):
     )
     monkeypatch.setattr(
         gazu.person,
-        "get_person",
-        lambda x: mock_data.all_persons[0],
+        "all_persons",
+        lambda: mock_data.all_persons,
     )
     res = fullsync.get_tasks(
         PROJECT_ID,
         {"task-type-id-1": "Animation", "task-type-id-2": "Compositing"},
         {"task-status-id-1": "Todo", "task-status-id-2": "Approved"},
+        mock_data.all_persons,
     )
     # assert len(res) == 2
     # assert res[0]['id'] == "task-id-1"
@@ -108,6 +110,117 @@ def test_get_tasks(gazu, monkeypatch):
 # assert res[1]['task_status_name'] == 'Todo'
 
 
+def test_get_tasks_assignees(gazu, monkeypatch):
+    tasks = [
+        {
+            **mock_data.all_tasks_for_project[0],
+            "assignees": ["person-id-3", "person-id-1"],
+        },
+        {
+            **mock_data.all_tasks_for_project[1],
+            "assignees": ["person-id-2"],
+        },
+    ]
+    monkeypatch.setattr(gazu.task, "all_tasks_for_project", lambda x: tasks)
+    monkeypatch.setattr(
+        ayon_api,
+        "get_users",
+        lambda: [
+            {"name": "user1", "attrib": {"email": "user-id-1@temp.com"}},
+            {"name": "user2", "attrib": {"email": "user-id-2@temp.com"}},
+            {"name": "user3", "attrib": {"email": "user-id-3@temp.com"}},
+        ],
+    )
+    calls = []
+
+    def all_persons():
+        calls.append(1)
+        return mock_data.all_persons
+
+    monkeypatch.setattr(gazu.person, "all_persons", all_persons)
+
+    # person-id-2 is not in the given persons list
+    res = fullsync.get_tasks(
+        PROJECT_ID,
+        {"task-type-id-1": "Animation", "task-type-id-2": "Compositing"},
+        {"task-status-id-1": "Todo", "task-status-id-2": "Approved"},
+        [mock_data.all_persons[0], mock_data.all_persons[2]],
+    )
+
+    # the missing person is fetched once for all tasks
+    assert len(calls) == 1
+    # the Kitsu order of the assignees is kept
+    assert res[0]["assignees"] == ["user3", "user1"]
+    assert res[1]["assignees"] == ["user2"]
+
+
+def test_filter_updated():
+    records = [
+        {"id": "1", "updated_at": "2024-01-01T00:00:00"},
+        {"id": "2", "updated_at": "2024-02-01T12:30:00"},
+        {"id": "3", "updated_at": None},
+    ]
+    kitsu_ids = set()
+
+    res = fullsync.filter_updated(records, "2024-01-15T00:00:00", kitsu_ids)
+    assert [r["id"] for r in res] == ["2"]
+    assert kitsu_ids == {"1", "2", "3"}
+
+    assert fullsync.filter_updated(records) == records
+
+    # entities changed shortly before the previous sync are synced again
+    assert (
+        fullsync.get_updated_since("2024-02-01T12:30:00")
+        == "2024-02-01T12:20:00"
+    )
+
+
+def test_get_concepts(gazu, monkeypatch):
+    def unsupported(project_id):
+        raise gazu.exception.RouteNotFoundException(project_id)
+
+    def unavailable(project_id):
+        raise gazu.exception.ServerErrorException(project_id)
+
+    # kitsu versions without concepts have none
+    monkeypatch.setattr(
+        gazu.concept, "all_concepts_for_project", unsupported
+    )
+    assert fullsync.get_concepts(PROJECT_ID) == []
+
+    # other errors must not look like all concepts were deleted
+    monkeypatch.setattr(
+        gazu.concept, "all_concepts_for_project", unavailable
+    )
+    with pytest.raises(gazu.exception.ServerErrorException):
+        fullsync.get_concepts(PROJECT_ID)
+
+
+def test_remove_deleted_entities(mocker):
+    class Parent:
+        entrypoint = "/addons/kitsu/9.9.9"
+        sync_aggregate_events = False
+
+    mocker.patch.object(ayon_api, "get_base_url", return_value="ayon")
+    get = mocker.patch.object(ayon_api, "get")
+    get.return_value.status_code = 200
+    get.return_value.data = {
+        "folders": {"shot-id-1": "Shot", "concept-id-1": "Concept"},
+        "tasks": ["task-id-1", "task-id-2"],
+    }
+    post = mocker.patch.object(ayon_api, "post")
+
+    fullsync.remove_deleted_entities(
+        Parent(), "AYON_Project", {"task-id-1"}, {"Concept"}
+    )
+
+    # concepts were not listed, so none of them is removed
+    assert post.call_args.kwargs["entities"] == [
+        {"id": "task-id-2", "type": "Task", "ayon_server_url": "ayon"},
+        {"id": "shot-id-1", "type": "Shot", "ayon_server_url": "ayon"},
+    ]
+
+
 def test_full_sync(gazu, processor, monkeypatch, mocker):
     # mock all kitsu data coming from gazu
     monkeypatch.setattr(
@@ -174,24 +287,76 @@ def test_full_sync(gazu, processor, monkeypatch, mocker):
     # mocker patches
     log_info = mocker.patch.object(logging, "info")
     api_patch = mocker.patch.object(ayon_api, "post")
+    api_patch.return_value.status_code = 200
+    mocker.patch.object(
+        ayon_api, "get_project", return_value={"data": {"kitsuProjectId": 1}}
+    )
+    update_project = mocker.patch.object(ayon_api, "update_project")
 
     processor.entrypoint = "/addons/kitsu/9.9.9"
-    res = fullsync.full_sync(processor, PROJECT_ID, "AYON_Project")
+    processor.sync_chunk_size = 2
+    progress = []
+    fullsync.project_full_sync(
+        processor, PROJECT_ID, "AYON_Project", progress=progress.append
+    )
 
     # assert logging
     log_calls = log_info.call_args_list
-    assert len(log_calls) == 2
-
     assert log_calls[0][0][0] == f"Syncing kitsu project {PROJECT_ID} to AYON_Project"
-    assert log_calls[1][0][0].startswith(
+    assert log_calls[-1][0][0].startswith(
         "Full Sync for project AYON_Project completed in "
     )
 
-    # assert ayon api call
-    api_patch.assert_called_once()
-    args = api_patch.call_args.args
-    kwargs = api_patch.call_args.kwargs
+    # assert ayon api calls - entities are pushed in chunks of one session
+    calls = api_patch.call_args_list
+    assert all(c.args[0] == "/addons/kitsu/9.9.9/push" for c in calls)
+    assert all(c.kwargs["project_name"] == "AYON_Project" for c in calls)
+    assert len({c.kwargs["session_id"] for c in calls}) == 1
+    assert all(len(c.kwargs["entities"]) <= 2 for c in calls)
+    assert sum(len(c.kwargs["entities"]) for c in calls) == 19
+
+    # persons are pushed first, tasks last and the session is closed
+    assert calls[0].kwargs["entities"][0]["type"] == "Person"
+    assert calls[-2].kwargs["entities"][-1]["type"] == "Task"
+    assert calls[-1].kwargs["close_session"] is True
+
+    # progress is reported after every chunk
+    assert len(progress) >= len(calls) - 1
+    assert progress == sorted(progress)
+    assert progress[-1] == 100
+
+    # the newest updated_at is stored as the watermark of the next sync
+    update_project.assert_called_once_with(
+        "AYON_Project",
+        data={
+            "kitsuProjectId": 1,
+            "kitsuSyncWatermark": "2024-02-19T13:16:09",
+        },
+    )
+
+
+def test_sort_pairs(mocker):
+    pairs = [
+        {"kitsuProjectId": "1", "ayonProjectName": "small"},
+        {"kitsuProjectId": "2", "ayonProjectName": "large"},
+        {"kitsuProjectId": "3", "ayonProjectName": "urgent"},
+    ]
+    sizes = {"small": 1, "large": 100, "urgent": 10}
+    mocker.patch.object(
+        fullsync,
+        "get_synced_size",
+        lambda parent, project_name: sizes[project_name],
+    )
+
+    def names(sorted_pairs):
+        return [pair["ayonProjectName"] for pair in sorted_pairs]
 
-    assert args[0] == "/addons/kitsu/9.9.9/push"
-    assert kwargs["project_name"] == "AYON_Project"
-    assert len(kwargs["entities"]) == 19
+    assert names(fullsync.sort_pairs(None, pairs)) == [
+        "small", "large", "urgent"
+    ]
+    assert names(fullsync.sort_pairs(None, pairs, "largest_first")) == [
+        "large", "urgent", "small"
+    ]
+    assert names(
+        fullsync.sort_pairs(None, pairs, "largest_first", ["urgent"])
+    ) == ["urgent", "large", "small"]
@@ -0,0 +1,21 @@
+import base64
+import json
+
+from kitsu import get_token_expiry
+
+
+""" tests for the server side Kitsu client
+
+    $ poetry run pytest tests/test_kitsu.py
+"""
+
+
+def _token(payload):
+    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode())
+    return f"header.{encoded.decode().rstrip('=')}.signature"
+
+
+def test_get_token_expiry():
+    assert get_token_expiry(_token({"exp": 1700000000})) == 1700000000
+    assert get_token_expiry(_token({"sub": "user"})) == 0, "missing exp"
+    assert get_token_expiry("not-a-token") == 0, "invalid token"
@@ -0,0 +1,47 @@
+import threading
+
+from processor.pipeline import EventPipeline
+
+
+def test_event_pipeline_keeps_order_per_key():
+    pipeline = EventPipeline(workers=4, queue_size=2)
+    pipeline.start()
+
+    handled = {"task-1": [], "task-2": []}
+    for i in range(20):
+        for key in handled:
+            pipeline.submit(key, lambda key=key, i=i: handled[key].append(i))
+    pipeline.join()
+
+    assert handled["task-1"] == list(range(20))
+    assert handled["task-2"] == list(range(20))
+
+
+def test_event_pipeline_runs_keys_in_parallel():
+    pipeline = EventPipeline(workers=2)
+    pipeline.start()
+
+    # find two keys handled by different workers
+    keys = [f"task-{i}" for i in range(10)]
+    first_queue = pipeline.get_queue(keys[0])
+    other = next(key for key in keys if pipeline.get_queue(key) is not first_queue)
+
+    # the first event blocks its worker until the second one ran
+    released = threading.Event()
+    pipeline.submit(keys[0], lambda: released.wait(5))
+    pipeline.submit(other, released.set)
+    pipeline.join()
+
+    assert released.is_set()
+
+
+def test_event_pipeline_survives_errors():
+    pipeline = EventPipeline(workers=1)
+    pipeline.start()
+
+    handled = []
+    pipeline.submit("task-1", lambda: 1 / 0)
+    pipeline.submit("task-1", lambda: handled.append(True))
+    pipeline.join()
+
+    assert handled == [True]
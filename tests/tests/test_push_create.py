@@ -82,8 +82,9 @@ def test_push_assets(api, kitsu_url, monkeypatch):
     assert res.status_code == 200
     folder = res.data
 
-    # check the kitsu id is saved to data
-    assert folder["data"] == {"kitsuId": "asset-id-2"}
+    # check the kitsu id and the hash of the kitsu entity are saved to data
+    assert folder["data"]["kitsuId"] == "asset-id-2"
+    assert folder["data"]["kitsuHash"]
 
 
 def test_push_episodes(api, kitsu_url):
@@ -279,7 +280,7 @@ def test_push_tasks(api, kitsu_url, monkeypatch):
     assert task_1["active"] is True
     assert task_1["assignees"] == ["user-id-1", "user-id-3"]
     assert task_1["label"] == "animation"
-    assert task_1["data"] == {"kitsuId": "task-id-1"}
+    assert task_1["data"]["kitsuId"] == "task-id-1"
     assert task_1["status"] == "Todo"
     assert task_1["attrib"] == {
         "resolutionHeight": 1080,
@@ -301,7 +302,7 @@ def test_push_tasks(api, kitsu_url, monkeypatch):
 
     assert task_2["taskType"] == "Compositing"
     assert task_2["name"] == "compositing"
-    assert task_2["data"] == {"kitsuId": "task-id-2"}
+    assert task_2["data"]["kitsuId"] == "task-id-2"
     assert task_2["status"] == "Approved"  # status not working yet?
 
     assert task_2["attrib"] == {
@@ -59,6 +59,81 @@ def test_user_names(api, kitsu_url, users, users_enabled, access_group):
     api.delete("/users/esbjornbob.kozuscek1")
 
 
+def test_push_person_without_project(
+    api, kitsu_url, users_enabled, access_group
+):
+    # realtime person events are pushed without a project
+    api.delete("/users/no.project")
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name="",
+        entities=[
+            {
+                "email": "no.project@temp.com",
+                "first_name": "No",
+                "full_name": "No Project",
+                "id": "person-id-no-project",
+                "last_name": "Project",
+                "type": "Person",
+                "role": "user",
+            },
+        ],
+    )
+    assert res.status_code == 200
+    assert res.data["users"] == {"person-id-no-project": "no.project"}
+
+    api.delete("/users/no.project")
+
+
+def test_push_person_roles(api, kitsu_url, users_enabled, access_group):
+    # the default settings map kitsu roles to ayon roles
+    roles = {
+        "admin": (True, False),  # Studio manager => admin
+        "manager": (False, True),  # Production manager => manager
+        "user": (False, False),  # Artist => user
+    }
+    entities = [
+        {
+            "email": f"role.{role}@temp.com",
+            "first_name": "Role",
+            "full_name": f"Role {role}",
+            "id": f"person-id-role-{role}",
+            "last_name": role,
+            "type": "Person",
+            "role": role,
+        }
+        for role in roles
+    ]
+    for role in roles:
+        api.delete(f"/users/role.{role}")
+
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=entities,
+    )
+    assert res.status_code == 200
+
+    for role, (is_admin, is_manager) in roles.items():
+        user = api.get_user(f"role.{role}")
+        assert bool(user["data"].get("isAdmin")) == is_admin
+        assert bool(user["data"].get("isManager")) == is_manager
+        assert user["data"]["defaultAccessGroups"] == ["test_kitsu_group"]
+
+    # a changed role is applied to the existing user
+    entities[0]["role"] = "user"
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=entities[:1],
+    )
+    assert res.status_code == 200
+    assert not api.get_user("role.admin")["data"].get("isAdmin")
+
+    for role in roles:
+        api.delete(f"/users/role.{role}")
+
+
 def test_push_bot(api, kitsu_url, users_enabled):
     """test for new API token feature in Kitsu 0.19.2 - Person where is_bot=True"""
 
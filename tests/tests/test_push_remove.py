@@ -33,3 +33,25 @@ def test_remove_shot(api, kitsu_url):
     }
     res = api.post(f"{kitsu_url}/remove", project_name=PROJECT_NAME, entities=[entity])
     assert res.status_code == 200
+
+
+def test_remove_bulk(init_data, api, kitsu_url):
+    # parents are listed before their children, they are removed last
+    entities = [
+        {"id": "sequence-id-2", "type": "Sequence"},
+        {"id": "shot-id-3", "type": "Shot"},
+        {"id": "missing-shot-id", "type": "Shot"},
+    ]
+    res = api.post(
+        f"{kitsu_url}/remove",
+        project_name=PROJECT_NAME,
+        entities=entities,
+        bulk=True,
+    )
+    assert res.status_code == 200
+    assert res.data["results"] == {
+        "sequence-id-2": "deleted",
+        "shot-id-3": "deleted",
+        "missing-shot-id": "not_found",
+    }
+    assert set(res.data["folders"]) == {"sequence-id-2", "shot-id-3"}
@@ -232,3 +232,200 @@ def test_update_task_with_new_type(api, kitsu_url):
     # check the type has been created
     res = api.get(f"/projects/{PROJECT_NAME}")
     assert "New Type" in [t["name"] for t in res.data["taskTypes"]]
+
+
+def test_push_batches_in_sync_order(api, kitsu_url):
+    # the shot is listed before its (new) parent sequence and every entity
+    # is synced in its own batch - the sequence still has to be synced first
+    sequence = {
+        "id": "sequence-id-batch",
+        "type": "Sequence",
+        "name": "SEQ_BATCH",
+        "parent_id": "episode-id-2",
+    }
+    shot = {
+        "id": "shot-id-batch",
+        "type": "Shot",
+        "name": "SH_BATCH",
+        "parent_id": "sequence-id-batch",
+        "data": {},
+    }
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=[shot, sequence],
+        batch_size=1,
+    )
+    assert res.status_code == 200
+    assert "sequence-id-batch" in res.data["folders"]
+    assert "shot-id-batch" in res.data["folders"]
+
+    folder = api.get_folder_by_id(
+        PROJECT_NAME, res.data["folders"]["shot-id-batch"]
+    )
+    assert folder["parentId"] == res.data["folders"]["sequence-id-batch"]
+
+
+def test_push_unchanged_entities_are_skipped(api, kitsu_url):
+    shot = {
+        "id": "shot-id-hash",
+        "type": "Shot",
+        "name": "SH_HASH",
+        "parent_id": "sequence-id-1",
+        "data": {"frame_in": 1, "frame_out": 50},
+    }
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=[shot],
+    )
+    assert res.status_code == 200
+    assert res.data["counts"] == {"created": 1, "updated": 0, "skipped": 0}
+
+    # the very same payload is skipped without any changes
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=[shot],
+    )
+    assert res.status_code == 200
+    assert res.data["counts"] == {"created": 0, "updated": 0, "skipped": 1}
+    assert res.data["folders"] == {}
+
+    # a changed payload is synced again
+    shot["data"] = {"frame_in": 1, "frame_out": 60}
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=[shot],
+    )
+    assert res.status_code == 200
+    assert res.data["counts"] == {"created": 0, "updated": 1, "skipped": 0}
+
+
+def test_push_children_inherit_updated_frame_start(api, kitsu_url):
+    # both pushes share one sync session, and with it the folder index
+    sequence = {
+        "id": "sequence-id-frames",
+        "type": "Sequence",
+        "name": "SEQ_FRAMES",
+        "parent_id": "episode-id-1",
+        "data": {"frame_in": 1001},
+    }
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=[sequence],
+        session_id="frames-session",
+    )
+    assert res.status_code == 200
+
+    # the parent is updated in the same request its new child is created
+    sequence["data"] = {"frame_in": 2001}
+    shot = {
+        "id": "shot-id-frames",
+        "type": "Shot",
+        "name": "SH_FRAMES",
+        "parent_id": "sequence-id-frames",
+        "nb_frames": 10,
+        "data": {},
+    }
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=[sequence, shot],
+        session_id="frames-session",
+        close_session=True,
+    )
+    assert res.status_code == 200
+
+    folder = api.get_folder_by_id(
+        PROJECT_NAME, res.data["folders"]["shot-id-frames"]
+    )
+    assert folder["attrib"]["frameStart"] == 2001
+    assert folder["attrib"]["frameEnd"] == 2010
+
+    # only the parent changed in Kitsu, the unchanged child is pushed again
+    # and its end frame follows the new frame start
+    sequence["data"] = {"frame_in": 3001}
+    for entity_dict in (sequence, shot):
+        res = api.post(
+            f"{kitsu_url}/push",
+            project_name=PROJECT_NAME,
+            entities=[entity_dict],
+        )
+        assert res.status_code == 200
+
+    folder = api.get_folder_by_id(PROJECT_NAME, folder["id"])
+    assert folder["attrib"]["frameStart"] == 3001
+    assert folder["attrib"]["frameEnd"] == 3010
+
+
+def test_push_levels_concurrently(api, kitsu_url):
+    # two independent branches pushed in reverse order, every entity in its
+    # own batch so the batches of a level run concurrently
+    entities = []
+    for branch in ("a", "b"):
+        entities += [
+            {
+                "id": f"shot-id-dag-{branch}",
+                "type": "Shot",
+                "name": f"SH_DAG_{branch.upper()}",
+                "parent_id": f"sequence-id-dag-{branch}",
+                "data": {},
+            },
+            {
+                "id": f"sequence-id-dag-{branch}",
+                "type": "Sequence",
+                "name": f"SEQ_DAG_{branch.upper()}",
+                "parent_id": "episode-id-dag",
+            },
+        ]
+    entities.append(
+        {"id": "episode-id-dag", "type": "Episode", "name": "EP_DAG"}
+    )
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=entities,
+        batch_size=1,
+        concurrency=4,
+    )
+    assert res.status_code == 200
+    folders = res.data["folders"]
+    assert res.data["counts"]["created"] == 5
+
+    for branch in ("a", "b"):
+        shot = api.get_folder_by_id(PROJECT_NAME, folders[f"shot-id-dag-{branch}"])
+        assert shot["parentId"] == folders[f"sequence-id-dag-{branch}"]
+        sequence = api.get_folder_by_id(
+            PROJECT_NAME, folders[f"sequence-id-dag-{branch}"]
+        )
+        assert sequence["parentId"] == folders["episode-id-dag"]
+
+
+def test_push_aggregated_events(api, kitsu_url):
+    res = api.post(
+        f"{kitsu_url}/push",
+        project_name=PROJECT_NAME,
+        entities=[
+            {
+                "id": "episode-id-events",
+                "type": "Episode",
+                "name": "EP_EVENTS",
+            }
+        ],
+        aggregate_events=True,
+    )
+    assert res.status_code == 200
+    folder_id = res.data["folders"]["episode-id-events"]
+
+    events = list(
+        api.get_events(
+            topics=["kitsu.sync.batch"], project_names=[PROJECT_NAME]
+        )
+    )
+    assert any(
+        folder_id in event["summary"].get("created", {}).get("folder", [])
+        for event in events
+    )
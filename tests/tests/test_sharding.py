@@ -0,0 +1,32 @@
+import pytest
+
+from processor.sharding import Shard
+
+
+def test_shard_partitions_projects():
+    shards = [Shard(index, 3) for index in range(3)]
+    project_ids = [f"project-id-{i}" for i in range(30)]
+
+    # every project is owned by exactly one replica
+    for project_id in project_ids:
+        assert sum(shard.owns(project_id) for shard in shards) == 1
+
+    # events without a project belong to the first replica
+    assert [shard.owns(None) for shard in shards] == [True, False, False]
+
+
+def test_single_shard_owns_everything():
+    shard = Shard()
+    assert shard.owns("project-id-1")
+    assert shard.owns(None)
+
+
+def test_shard_from_env(monkeypatch):
+    monkeypatch.setenv("KITSU_PROCESSOR_REPLICA", "1")
+    monkeypatch.setenv("KITSU_PROCESSOR_REPLICAS", "2")
+    shard = Shard.from_env()
+    assert (shard.index, shard.count) == (1, 2)
+
+    monkeypatch.setenv("KITSU_PROCESSOR_REPLICA", "2")
+    with pytest.raises(ValueError):
+        Shard.from_env()
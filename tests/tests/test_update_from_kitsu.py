@@ -49,7 +49,7 @@ def test_new_asset(init_data, api, gazu, processor, monkeypatch):
 
     assert folder["label"] == "My New Asset Name"
     assert folder["path"] == "/assets/character/my_new_asset_name"
-    assert folder["data"] == {"kitsuId": "new-asset-id-1"}
+    assert folder["data"]["kitsuId"] == "new-asset-id-1"
     assert folder["folderType"] == "Asset"
 
 
@@ -80,7 +80,7 @@ def test_update_asset(api, gazu, processor, monkeypatch):
 
     assert folder["label"] == "My Updated Asset Name"
     assert folder["path"] == "/assets/character/my_updated_asset_name"
-    assert folder["data"] == {"kitsuId": "asset-id-1"}
+    assert folder["data"]["kitsuId"] == "asset-id-1"
     assert folder["folderType"] == "Asset"
 
 
@@ -142,7 +142,7 @@ def test_update_task(api, gazu, processor, monkeypatch):
     tasks = list(api.get_tasks(PROJECT_NAME))
     res = api.get(f"/projects/{PROJECT_NAME}/tasks/{tasks[1]['id']}")
     task = res.data
-    assert task["data"] == {"kitsuId": "task-id-2"}
+    assert task["data"]["kitsuId"] == "task-id-2"
     assert task["status"] == "Approved"
 
     # update status  Approved => Todo